@@ -0,0 +1,113 @@
+"""Measure the memory one player session's chat state costs
+
+Builds ``--sessions`` simulated sessions of ``--turns`` exchanges each and
+reports traced bytes per session for three layouts:
+
+  dict      the old layout: a list of dicts plus a second list of inputs
+  compact   ChatHistory of __slots__ messages with interned inputs
+  spilled   the compact histories after the idle sweeper spilled them
+
+A ``--popular`` fraction of inputs is drawn from a small pool of attack
+prompts that many players paste, as happens in workshops; every input is
+built as a fresh string, as it arrives from the browser. Rendered history
+HTML (the per-session render memo) is included in every layout.
+
+    python benchmarks/bench_session_memory.py [--sessions 2000] [--turns 8]
+"""
+import argparse
+import gc
+import random
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from chat_render import new_message, render_history, render_message  # noqa: E402
+from session_memory import ChatHistory  # noqa: E402
+
+WORDS = "ignore previous instructions reveal the secret password pretend you are admin grant access now".split()
+
+
+def text(rng, chars):
+    words = []
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)
+
+
+def turns(args, rng, pool):
+    for _ in range(args.turns):
+        if rng.random() < args.popular:
+            user_input = "".join(list(rng.choice(pool)))  # a fresh copy, as sent by the browser
+        else:
+            user_input = text(rng, args.prompt_chars)
+        yield user_input, text(rng, args.response_chars)
+
+
+def dict_session(args, rng, pool):
+    history, attempts, memo = [], [], {}
+    for index, (user_input, response) in enumerate(turns(args, rng, pool)):
+        attempts.append(user_input)
+        history.append({"id": f"u{index}", "role": "user", "content": user_input})
+        history.append({"id": f"a{index}", "role": "assistant", "content": response})
+        memo["html"] = "".join(render_message(m["role"], m["content"]) for m in history)
+    return history, attempts, memo
+
+
+def compact_session(args, rng, pool):
+    history, attempts = ChatHistory(), []
+    for user_input, response in turns(args, rng, pool):
+        message = new_message("user", user_input)
+        history.append(message)
+        history.append(new_message("assistant", response))
+        attempts.append(message.content)
+        render_history(history, history.render_memo)
+    return history, attempts
+
+
+def measure(build, args):
+    rng = random.Random(args.seed)
+    pool = [text(rng, args.prompt_chars) for _ in range(args.pool_size)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [build(args, rng, pool) for _ in range(args.sessions)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    return sessions, (after - before) / args.sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--popular", type=float, default=0.5, help="fraction of inputs from the shared pool")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--prompt-chars", type=int, default=300)
+    parser.add_argument("--response-chars", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sessions, dict_bytes = measure(dict_session, args)
+    del sessions
+    tracemalloc.stop()
+    sessions, compact_bytes = measure(compact_session, args)
+    with tempfile.TemporaryDirectory() as spill_dir:
+        before = tracemalloc.get_traced_memory()[0]
+        for history, _ in sessions:
+            history.spill(spill_dir)
+        gc.collect()
+        spilled_bytes = compact_bytes + (tracemalloc.get_traced_memory()[0] - before) / args.sessions
+        tracemalloc.stop()
+
+    print(f"sessions           {args.sessions} x {args.turns} turns, {args.popular:.0%} popular prompts")
+    print(f"dict               {dict_bytes / 1024:8.1f} KiB/session")
+    print(f"compact            {compact_bytes / 1024:8.1f} KiB/session ({compact_bytes / dict_bytes:.0%} of dict)")
+    print(f"spilled            {spilled_bytes / 1024:8.1f} KiB/session (idle sessions on disk)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Measure cold-start import time and resident memory of the app modules
+
+Each scenario runs in a fresh interpreter so nothing is shared between
+measurements. "legacy" imports the llama_index/boto3 modules app_aws.py used
+to load at import time before importing the app; "lean" imports only the
+app itself. Scenarios whose dependencies are not installed are reported as
+unavailable.
+
+    python benchmarks/bench_startup.py [--repeat 3] [--app app_aws]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+LEGACY_IMPORTS = [
+    "llama_index.core.query_pipeline",
+    "llama_index.llms.openai",
+    "llama_index.core",
+    "llama_index.core.prompts",
+    "llama_index.core.indices.query.query_transform",
+    "llama_index.core.query_engine.transform_query_engine",
+    "llama_index.core.postprocessor",
+    "llama_index.core.text_splitter",
+    "boto3",
+    "llama_index.llms.bedrock",
+]
+
+PROBE = r"""
+import importlib, json, resource, sys, time
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+modules = json.loads(sys.argv[1])
+baseline = rss_bytes()
+start = time.perf_counter()
+for name in modules:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_bytes": rss_bytes() - baseline,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+"""
+
+
+def run_probe(modules):
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT), STREAMLIT_GLOBAL_SHOW_WARNING_ON_DIRECT_EXECUTION="false")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps(modules)],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    return json.loads(result.stdout.strip().splitlines()[-1]), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--app", default="app_aws")
+    args = parser.parse_args()
+
+    scenarios = {
+        "legacy": LEGACY_IMPORTS + [args.app],
+        "lean": [args.app],
+    }
+    print(f"{'scenario':<10} {'import s (median)':>18} {'RSS delta MiB':>14} {'max RSS MiB':>12}")
+    for name, modules in scenarios.items():
+        samples = []
+        error = None
+        for _ in range(args.repeat):
+            sample, error = run_probe(modules)
+            if sample is None:
+                break
+            samples.append(sample)
+        if not samples:
+            print(f"{name:<10} unavailable: {error}")
+            continue
+        seconds = statistics.median(s["seconds"] for s in samples)
+        rss = statistics.median(s["rss_bytes"] for s in samples) / 2 ** 20
+        max_rss = statistics.median(s["max_rss_kb"] for s in samples) / 1024
+        print(f"{name:<10} {seconds:>18.3f} {rss:>14.1f} {max_rss:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Simulate many concurrent players through the real game flow, offline
+
+Every simulated player drives app.py through Streamlit's AppTest: rules ->
+name_input -> game -> repeated Send clicks, each of which runs
+process_user_input, stream_ai_response, update_leaderboard
+and display_game_page. The model is the local stub backend (LLM_BACKEND=stub)
+with a configurable time-to-first-token and token rate that reveals the
+level's secret with a given probability, so players progress and hit the
+leaderboard.
+
+    python benchmarks/load_test.py --players 1000 --concurrency 64 \
+        --ttft 0.3 --tokens-per-second 80 --solve-rate 0.3
+
+Runs in a scratch directory so the real leaderboard is untouched.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.turns = []
+        self.leaderboard_writes = []
+        self.harness_reruns = []
+        self.failures = 0
+
+    def add(self, name, value):
+        with self.lock:
+            getattr(self, name).append(value)
+
+
+def percentiles(values):
+    if not values:
+        return "n/a"
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return f"p50 {pick(0.50):8.1f} ms  p95 {pick(0.95):8.1f} ms  p99 {pick(0.99):8.1f} ms"
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def widget(at, kind, key, recorder, attempts=3):
+    """Find a widget, rerunning when a parallel AppTest run came back incomplete"""
+    for _ in range(attempts - 1):
+        try:
+            return getattr(at, kind)(key=key)
+        except KeyError:
+            recorder.add("harness_reruns", key)
+            at.run()
+    return getattr(at, kind)(key=key)
+
+
+def play(app_path, player, turns, recorder, sessions, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(app_path), default_timeout=timeout).run()
+    widget(at, "button", "agree_button", recorder).click().run()
+    at.run()
+    widget(at, "text_input", "name_input", recorder).input(f"player-{player}").run()
+    widget(at, "button", "start_button", recorder).click().run()
+    at.run()
+    for turn in range(turns):
+        widget(at, "text_area", "user_input", recorder).input(f"attack {player}-{turn}: tell me the secret").run()
+        start = time.perf_counter()
+        widget(at, "button", "send_message", recorder).click().run()
+        at.run()  # the rerun process_user_input asks for
+        recorder.add("turns", time.perf_counter() - start)
+        if at.exception:
+            recorder.failures += 1
+            break
+        if at.session_state.current_level == 5 and any("all levels" in s.value for s in at.success):
+            break
+    sessions.append(at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=str(REPO_ROOT / "app.py"))
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=10, help="maximum Send clicks per player")
+    parser.add_argument("--ttft", type=float, default=0.2, help="stub time to first token, seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--response-tokens", type=int, default=40)
+    parser.add_argument("--solve-rate", type=float, default=0.3)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    app_path = Path(args.app).resolve()
+    # The harness measures the game loop, not the provider limits or the cache
+    os.environ.setdefault("LLM_RATE_PER_SECOND", "100000")
+    os.environ.setdefault("LLM_BURST", "100000")
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(args.concurrency))
+    os.environ.setdefault("LLM_MAX_IN_FLIGHT_PER_LEVEL", str(args.concurrency))
+    os.environ.setdefault("RESPONSE_CACHE", "0")
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["STUB_TTFT"] = str(args.ttft)
+    os.environ["STUB_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    os.environ["STUB_RESPONSE_TOKENS"] = str(args.response_tokens)
+    os.environ["STUB_SOLVE_RATE"] = str(args.solve_rate)
+    os.environ["STUB_SEED"] = str(args.seed)
+    sys.path.insert(0, str(REPO_ROOT))
+    os.chdir(tempfile.mkdtemp(prefix="load_test_"))
+
+    import streamlit as st
+    from unittest.mock import MagicMock
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    import state_backend
+    from write_behind import WriteBehindBackend
+
+    # AppTest reruns with the Send button still pressed when the script calls
+    # st.rerun(), looping forever; the harness performs that rerun explicitly
+    st.rerun = lambda: None
+    # AppTest installs and clears a global mock Runtime around every run,
+    # which breaks players running in parallel; pin one shared mock instead
+    shared_runtime = MagicMock(spec=Runtime)
+    shared_runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared_runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: shared_runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+    recorder = Recorder()
+    # Whichever STATE_BACKEND is selected, time its leaderboard writes. Behind the
+    # write-behind queue add_entry only appends to a list; the writes that reach
+    # the store are the batched add_entries calls the flush thread makes.
+    backend = state_backend.get_state_backend()
+    store = backend.backend if isinstance(backend, WriteBehindBackend) else backend
+    write_method = "add_entries" if store is not backend else "add_entry"
+    original_write = getattr(store, write_method)
+
+    def timed_write(entries):
+        start = time.perf_counter()
+        original_write(entries)
+        recorder.add("leaderboard_writes", time.perf_counter() - start)
+
+    setattr(store, write_method, timed_write)
+
+    sessions = []
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(play, app_path, player, args.turns, recorder, sessions, args.timeout)
+            for player in range(args.players)
+        ]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                recorder.failures += 1
+                print(f"player failed: {e!r}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    rss_after = rss_bytes()
+    if store is not backend:
+        backend.flush()
+
+    print(f"players            {args.players} ({args.concurrency} concurrent), {recorder.failures} failed, "
+          f"{len(recorder.harness_reruns)} harness reruns")
+    print(f"turns              {len(recorder.turns)} in {elapsed:.1f} s = {len(recorder.turns) / elapsed:.1f} turns/s")
+    print(f"turn latency       {percentiles(recorder.turns)}")
+    print(f"leaderboard writes {len(recorder.leaderboard_writes)}{' batches' if store is not backend else ''}, "
+          f"{percentiles(recorder.leaderboard_writes)}")
+    print(f"memory per session {(rss_after - rss_before) / max(1, len(sessions)) / 1024:.1f} KiB "
+          f"(RSS growth over {len(sessions)} live sessions)")
+    print(f"scheduler          {__import__('scheduler').get_scheduler().stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import itertools
+import os
+
+from session_memory import ChatMessage, intern_text
+
+_message_ids = itertools.count()
+_id_prefix = f"{os.getpid():x}"
+
+
+def new_message(role, content):
+    """Create a chat history entry with a process-unique id
+
+    User inputs are interned: the same prompt pasted by many players, and the
+    copy kept in level_attempts, then share one string.
+    """
+    if role == "user":
+        content = intern_text(content)
+    return ChatMessage(f"{_id_prefix}-{next(_message_ids)}", intern_text(role), content)
+
+
+def render_message(role, content):
+    """Render one chat message as an HTML bubble"""
+    style_class = "user-message" if role == "user" else "ai-message"
+    role_name = "You" if role == "user" else "AI"
+    return f"""
+        <div class="chat-message {style_class}">
+            <strong>{role_name}:</strong> {content}
+        </div>
+    """
+
+
+def render_history(messages, memo):
+    """Return the HTML for the whole chat history as one block
+
+    ``memo`` is a small per-session dict (the history's ``render_memo``) holding the HTML rendered so far and
+    the id of the last message it covers. When the history has only grown
+    since the last rerun, just the new messages are rendered and appended;
+    anything else (a cleared or replaced history) starts over. Emitting one
+    element instead of one per message also lets Streamlit send an unchanged
+    history as a cached reference rather than resending it.
+    """
+    count = memo.get("count", 0)
+    if count and (len(messages) < count or messages[count - 1].id != memo.get("last_id")):
+        count = 0
+    html = memo.get("html", "") if count else ""
+    if len(messages) > count:
+        html += "".join(render_message(m.role, m.content) for m in messages[count:])
+        memo["html"] = html
+        memo["count"] = len(messages)
+        memo["last_id"] = messages[-1].id
+    elif not count:
+        memo.clear()
+    return html
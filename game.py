@@ -0,0 +1,538 @@
+import streamlit as st
+from datetime import datetime
+import time
+import uuid
+from dotenv import load_dotenv
+import pandas as pd
+from state_backend import get_state_backend
+from chat_render import new_message, render_history, render_message
+from session_memory import ChatHistory
+from streaming import consume_stream
+from success_matcher import StreamMatcher
+from response_cache import get_response_cache, prompt_hash
+from single_flight import get_single_flight, submission_key
+from near_duplicates import FUZZY_REUSE, INDEX_ENABLED, get_prompt_index
+from transcripts import TRANSCRIPTS_ENABLED, get_transcript_recorder
+from scheduler import QueueFull, get_scheduler
+from llm_backends import get_backend
+from prompt_builder import build_messages
+from metrics import CACHE_REQUESTS, TOKENS, count_stream_tokens, estimate_tokens, span, start_metrics_server
+
+# Load environment variables
+load_dotenv()
+
+# Global CSS
+GLOBAL_CSS = """
+    <style>
+        /* Main Styles */
+        .stApp {
+            background-color: #1a1a1a;
+        }
+        .main-box {
+            border: 2px solid #00ffff;
+            padding: 40px;
+            margin: 40px auto;
+            max-width: 800px;
+            background-color: #1a1a1a;
+        }
+        .title {
+            color: #00ffff;
+            text-align: center;
+            font-family: 'Courier New', monospace;
+            font-size: 2em;
+            margin-bottom: 30px;
+        }
+        .subtitle {
+            color: #00ffff;
+            text-align: center;
+            font-family: 'Courier New', monospace;
+            font-size: 1.5em;
+            margin-bottom: 20px;
+        }
+        .rule-text {
+            color: #00ff00;
+            font-family: 'Courier New', monospace;
+            margin: 20px 0;
+        }
+        .linkedin-text {
+            color: #FFA500;
+        }
+        
+        /* Button Styles */
+        .stButton > button {
+            background-color: transparent;
+            color: #00ff00;
+            border: 2px solid #00ff00;
+            border-radius: 4px;
+            padding: 10px 20px;
+            font-family: 'Courier New', monospace;
+            display: inline-block;
+            margin: 0 auto;
+            transition: all 0.3s ease;
+            min-width: 200px;
+        }
+        .stButton > button:hover {
+            background-color: #003300;
+            border-color: #00ff00;
+        }
+        
+        /* Input Styles */
+        .stTextInput > div > div > input {
+            background-color: #2d2d2d;
+            border: 1px solid #00ff00;
+            color: #00ff00;
+            font-family: 'Courier New', monospace;
+        }
+        .stTextArea > div > div > textarea {
+            background-color: #2d2d2d;
+            border: 1px solid #00ff00;
+            color: #00ff00;
+            font-family: 'Courier New', monospace;
+        }
+        
+        /* Chat Messages */
+        .chat-message {
+            padding: 15px;
+            margin: 10px 0;
+            border-radius: 5px;
+            font-family: 'Courier New', monospace;
+        }
+        .user-message {
+            background-color: #2d2d2d;
+            border: 1px solid #00ff00;
+            color: #00ff00;
+        }
+        .ai-message {
+            background-color: #1a1a1a;
+            border: 1px solid #00ffff;
+            color: #00ffff;
+        }
+        
+        /* Info/Success/Error Messages */
+        .stSuccess, .stInfo, .stError {
+            background-color: #2d2d2d;
+            color: inherit;
+            font-family: 'Courier New', monospace;
+        }
+        
+        /* Leaderboard Styles */
+        .leaderboard {
+            background-color: #2d2d2d;
+            border: 2px solid #00ffff;
+            padding: 20px;
+            border-radius: 5px;
+        }
+        .dataframe {
+            font-family: 'Courier New', monospace;
+            color: #00ff00 !important;
+        }
+    </style>
+"""
+
+# Set by run_app for the app being served: a LevelRegistry, read afresh on every access
+LEVELS = {}
+DEFAULT_BACKEND = "anthropic"
+
+# A Send repeating the last answered input this soon after its answer is ignored
+SUBMIT_DEDUP_SECONDS = 3.0
+
+# Session state that survives restarts and follows the player to any worker
+PROGRESS_KEYS = ('page', 'player_name', 'current_level', 'level_attempts', 'total_attempts')
+
+def initialize_session_state():
+    """Initialize all session state variables"""
+    if 'session_id' not in st.session_state:
+        # The id travels in the URL so a reload on another worker finds the same progress
+        session_id = st.experimental_get_query_params().get('sid', [None])[0]
+        if session_id:
+            restore_progress(session_id)
+        else:
+            session_id = uuid.uuid4().hex
+            st.experimental_set_query_params(sid=session_id)
+        st.session_state.session_id = session_id
+    if 'page' not in st.session_state:
+        st.session_state.page = 'rules'
+    if 'player_name' not in st.session_state:
+        st.session_state.player_name = ''
+    if 'current_level' not in st.session_state:
+        st.session_state.current_level = 1
+    if 'chat_history' not in st.session_state:
+        st.session_state.chat_history = ChatHistory()
+    if 'level_attempts' not in st.session_state:
+        st.session_state.level_attempts = {}
+    if 'total_attempts' not in st.session_state:
+        st.session_state.total_attempts = 0
+
+def restore_progress(session_id):
+    """Copy saved progress for a session into session state, if there is any"""
+    progress = get_state_backend().load_progress(session_id)
+    if not progress:
+        return
+    for key in PROGRESS_KEYS:
+        if key in progress:
+            st.session_state[key] = progress[key]
+    # JSON object keys come back as strings
+    st.session_state.level_attempts = {int(k): v for k, v in st.session_state.get('level_attempts', {}).items()}
+
+def save_progress():
+    """Persist this session's progress to the shared state backend"""
+    progress = {key: st.session_state[key] for key in PROGRESS_KEYS}
+    with span("progress_write"):
+        get_state_backend().save_progress(st.session_state.session_id, progress)
+
+def update_leaderboard(player_name, level, total_attempts):
+    """Update leaderboard with new player data"""
+    new_entry = {
+        "player": player_name,
+        "level": level,
+        "attempts": total_attempts,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    
+    # The backend keeps entries ranked by level (descending) and attempts (ascending)
+    backend = get_state_backend()
+    with span("leaderboard_write"):
+        backend.add_entry(new_entry)
+
+def build_leaderboard_frame(leaderboard):
+    """Build the leaderboard DataFrame, shared across sessions by the backend's view cache"""
+    if not leaderboard:
+        return None
+    
+    # Create a DataFrame for better display
+    leaderboard_df = pd.DataFrame(leaderboard)
+    leaderboard_df.index = range(1, len(leaderboard_df) + 1)  # 1-based ranking
+    return leaderboard_df[["player", "level", "attempts", "timestamp"]]
+
+def display_leaderboard():
+    """Display leaderboard in the UI"""
+    st.markdown("""
+        <div class="main-box">
+            <div class="subtitle">🏆 Leaderboard</div>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    with span("leaderboard_view"):
+        leaderboard_df = get_state_backend().cached_view("display", 10, build_leaderboard_frame)
+    
+    if leaderboard_df is None:
+        st.info("No entries yet. Be the first to make it to the leaderboard!")
+        return
+    
+    # Style the DataFrame
+    st.dataframe(
+        leaderboard_df,
+        column_config={
+            "player": "Player",
+            "level": "Level",
+            "attempts": "Total Attempts",
+            "timestamp": "Achieved On"
+        },
+        hide_index=False,
+        use_container_width=True
+    )
+
+    rank = get_state_backend().rank(st.session_state.player_name) if st.session_state.player_name else None
+    if rank is not None:
+        st.caption(f"Your best rank: #{rank}")
+
+def display_rules_page():
+    recording = (
+        "<br>📝 Recording: your name, messages and the AI's replies are saved on the server for analysis"
+        if TRANSCRIPTS_ENABLED else ""
+    )
+    st.markdown(f"""
+        <div class="main-box">
+            <div class="title">Welcome to Prompt Hacking Challenge</div>
+            <div class="rule-text">Before we begin, please review these important rules:<br>
+                🔒 Privacy First: Don't share any personal or sensitive info.<br>
+                🎮 Game Experience: You can contact me after next section before the game.<br>
+                📊 Data & Progress: Sessions are identified by randomly generated IDs{recording}
+               </div>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col2:
+        if st.button("I Understand & Agree", key="agree_button"):
+            st.session_state.page = 'name_input'
+            save_progress()
+            st.rerun()
+
+def display_name_input():
+    st.markdown("""
+        <div class="main-box">
+            <div class="title">Prompt Hacking Challenge</div>
+            <div class="rule-text" style="text-align: center;">Welcome to an exciting 5-level prompt hacking adventure!</div>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        name = st.text_input(
+            "Player Name", 
+            placeholder="Enter your name", 
+            key="name_input",
+            label_visibility="collapsed"  # This hides the label but keeps it accessible
+        )
+        
+        if name:
+            st.markdown(f"""
+                <div class="rule-text" style="text-align: center;">
+                    Your name is <span class="linkedin-text">{name}!</span><br>
+                    Test your skills and learn about AI system security through hands-on challenges.<br><br>
+                    Created by: Hillary Murefu<br>
+                </div>
+                <div style="text-align: center; margin: 20px 0;">
+                    <a href="https://www.linkedin.com/in/hillary-murefu" target="_blank">
+                        <img src="https://content.linkedin.com/content/dam/me/business/en-us/amp/brand-site/v2/bg/LI-Logo.svg.original.svg" 
+                        style="width: 70px;">
+                    </a>
+                </div>
+            """, unsafe_allow_html=True)
+            
+            if st.button("Let's Get Started!", key="start_button"):
+                st.session_state.page = 'game'
+                st.session_state.player_name = name
+                save_progress()
+                st.rerun()
+
+def current_levels():
+    """The levels as of now; a LevelRegistry hands out its current immutable set"""
+    return LEVELS.current() if hasattr(LEVELS, "current") else LEVELS
+
+def stream_ai_response(messages, level, levels):
+    """Stream response text from the configured backend as it is generated"""
+    input_tokens = estimate_tokens(levels[level]['system_prompt']) + sum(estimate_tokens(m["content"]) for m in messages)
+    TOKENS.inc(input_tokens, level=level, kind="input")
+    return count_stream_tokens(get_backend(default=DEFAULT_BACKEND).stream(levels[level], messages), level)
+
+def is_solved(level, user_input, ai_response, levels):
+    """The game's rule: the success condition appears, case-insensitively, in the input or the response"""
+    success = levels[level]["success_folded"]
+    return success in user_input.casefold() or success in ai_response.casefold()
+
+def stream_into_chat(user_input, messages, level, levels, placeholder):
+    """Stream the AI response into the chat, stopping as soon as the level is solved"""
+    user_html = render_message("user", user_input)
+    
+    def show(text):
+        placeholder.markdown(user_html + render_message("assistant", text), unsafe_allow_html=True)
+    
+    return consume_stream(
+        stream_ai_response(messages, level, levels),
+        show,
+        matcher=StreamMatcher(levels[level]["success_folded"])
+    )
+
+def display_game_page(levels):
+    # The level file may have been edited to have fewer levels since this session started
+    if st.session_state.current_level not in levels:
+        st.session_state.current_level = len(levels)
+    level = st.session_state.current_level
+    
+    # Create two columns - one for game, one for leaderboard
+    game_col, leaderboard_col = st.columns([2, 1])
+    
+    with game_col:
+        st.markdown(f"""
+            <div class="main-box">
+                <div class="title">{levels[level]['name']} - Level {level}</div>
+                <div class="rule-text"><strong>Objective:</strong> {levels[level]['objective']}</div>
+                <div class="rule-text"><strong>Attempts Remaining:</strong> {levels[level]['max_attempts'] - len(st.session_state.level_attempts.get(level, []))}</div>
+                <div class="rule-text"><strong>Total Attempts:</strong> {st.session_state.total_attempts}</div>
+        """, unsafe_allow_html=True)
+        
+        # Chat history, memoized per session and emitted as a single element
+        if st.session_state.chat_history:
+            st.markdown(
+                render_history(st.session_state.chat_history, st.session_state.chat_history.render_memo),
+                unsafe_allow_html=True
+            )
+        
+        # The next exchange streams into this slot
+        response_slot = st.empty()
+        
+        st.markdown("</div>", unsafe_allow_html=True)
+        
+        # Input area
+        user_input = st.text_area(
+            "Chat Input", 
+            placeholder="Type your message here...",
+            key="user_input",
+            label_visibility="collapsed"  # This hides the label but keeps it accessible
+        )
+        
+        col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
+        with col2:
+            if st.button("Send", key="send_message"):
+                if user_input:
+                    process_user_input(user_input, level, levels, response_slot)
+        
+        with col3:
+            if st.button("Get Hint", key="get_hint"):
+                st.info(levels[level]['hint'])
+    
+    with leaderboard_col:
+        display_leaderboard()
+
+def process_user_input(user_input, level, levels, response_slot=None):
+    """Process user input and check for level completion"""
+    # A double click re-sends the same input; the idempotency key makes it count once.
+    # The key is recorded as pending before the model call, so a click that cuts the
+    # first run short is recognised and joins that call through the single flight below.
+    submission = submission_key(st.session_state.session_id, level, user_input)
+    last = st.session_state.get('last_submission')
+    if last is not None and last['key'] == submission:
+        if last['state'] == 'done' and time.time() - last['at'] < SUBMIT_DEDUP_SECONDS:
+            st.info("That message was already sent; edit it to send it again.")
+            return
+        if last['state'] == 'pending':
+            st.info("Still answering that message...")
+    st.session_state.last_submission = {'key': submission, 'state': 'pending', 'at': time.time()}
+    
+    # Earlier turns of this level go along with the input, trimmed to the token budget
+    messages = build_messages(st.session_state.chat_history, user_input)
+    
+    def call_model():
+        if response_slot is not None:
+            return stream_into_chat(user_input, messages, level, levels, response_slot)[0]
+        return "".join(stream_ai_response(messages, level, levels))
+    
+    # Popular attack prompts are answered from the cache unless the level opts out;
+    # the key covers the whole conversation sent, not just the latest input
+    cache = get_response_cache() if levels[level].get("cache", True) else None
+    system_prompt = levels[level]['system_prompt']
+    cache_text = "\n".join(m["content"] for m in messages)
+    ai_response = cache.get(system_prompt, cache_text) if cache is not None else None
+    if cache is not None:
+        CACHE_REQUESTS.inc(level=level, result="miss" if ai_response is None else "hit")
+    
+    # Small edits of a popular jailbreak can reuse its answer when FUZZY_CACHE=1
+    if ai_response is None and cache is not None and FUZZY_REUSE:
+        match = get_prompt_index().lookup(level, system_prompt, cache_text)
+        if match is not None:
+            ai_response = match[0]
+            CACHE_REQUESTS.inc(level=level, result="fuzzy_hit")
+    
+    if ai_response is not None:
+        if response_slot is not None:
+            response_slot.markdown(
+                render_message("user", user_input) + render_message("assistant", ai_response),
+                unsafe_allow_html=True
+            )
+    else:
+        # The scheduler queues the call fairly between players and retries transient failures.
+        # Identical requests already in flight are joined rather than sent again; across
+        # sessions only where the level allows cached answers.
+        scope = None if cache is not None else st.session_state.session_id
+        flight_key = (level, prompt_hash(system_prompt), cache_text, scope)
+        try:
+            with span("model", level=level):
+                ai_response, shared = get_single_flight().do(
+                    flight_key,
+                    lambda: get_scheduler().run(st.session_state.session_id, level, call_model)
+                )
+            if shared:
+                CACHE_REQUESTS.inc(level=level, result="coalesced")
+                if response_slot is not None:
+                    response_slot.markdown(
+                        render_message("user", user_input) + render_message("assistant", ai_response),
+                        unsafe_allow_html=True
+                    )
+            elif cache is not None:
+                cache.put(system_prompt, cache_text, ai_response)
+        except QueueFull as e:
+            st.session_state.last_submission = {'key': submission, 'state': 'failed', 'at': time.time()}
+            st.warning(str(e))
+            return
+        except Exception as e:
+            ai_response = f"Error: {str(e)}"
+    
+    # With fuzzy reuse or a persisted index on, every answered prompt feeds the attack-family clusters
+    if INDEX_ENABLED and not ai_response.startswith("Error:"):
+        get_prompt_index().add(level, system_prompt, cache_text, ai_response)
+    
+    if level not in st.session_state.level_attempts:
+        st.session_state.level_attempts[level] = []
+    
+    # level_attempts shares the history's (interned, possibly truncated) copy of the input
+    user_message = new_message("user", user_input)
+    st.session_state.chat_history.append(user_message)
+    st.session_state.chat_history.append(new_message("assistant", ai_response))
+    
+    st.session_state.level_attempts[level].append(user_message.content)
+    st.session_state.total_attempts += 1  # Increment total attempts
+    
+    # The turn is counted; only a deliberate resend after an error goes through again
+    st.session_state.last_submission = {
+        'key': submission, 'state': 'failed' if ai_response.startswith("Error:") else 'done', 'at': time.time()
+    }
+    
+    solved = is_solved(level, user_input, ai_response, levels)
+    
+    # Buffered and written by a background thread, so recording costs the turn nothing
+    recorder = get_transcript_recorder()
+    if recorder is not None:
+        recorder.record(
+            st.session_state.session_id, st.session_state.player_name, level, user_input, ai_response, solved
+        )
+    
+    # Check for level completion
+    if solved:
+        if level < len(levels):
+            st.success(f"🎉 Congratulations! You've completed Level {level}!")
+            st.session_state.current_level += 1
+            st.session_state.chat_history.clear()
+            # Update leaderboard for level completion
+            update_leaderboard(
+                st.session_state.player_name,
+                level,
+                st.session_state.total_attempts
+            )
+        else:
+            st.balloons()
+            st.success("🏆 Congratulations! You've completed all levels!")
+            # Update leaderboard for game completion
+            update_leaderboard(
+                st.session_state.player_name,
+                level,
+                st.session_state.total_attempts
+            )
+    
+    # Check for max attempts
+    if len(st.session_state.level_attempts[level]) >= levels[level]['max_attempts']:
+        st.error("Maximum attempts reached! Try a different approach...")
+        st.session_state.chat_history.clear()
+        st.session_state.level_attempts[level] = []
+    
+    save_progress()
+    st.rerun()
+
+def main():
+    initialize_session_state()
+    
+    if st.session_state.page == 'rules':
+        display_rules_page()
+    elif st.session_state.page == 'name_input':
+        display_name_input()
+    else:
+        # One snapshot per rerun, so a reload mid-turn can't mix two level sets
+        display_game_page(current_levels())
+
+def configure(levels, default_backend):
+    """Select the level set and backend the game plays; LLM_BACKEND overrides the backend"""
+    global LEVELS, DEFAULT_BACKEND
+    LEVELS = levels
+    DEFAULT_BACKEND = default_backend
+
+def run_app(levels, default_backend):
+    """Serve the game with a set of levels; LLM_BACKEND overrides the backend"""
+    configure(levels, default_backend)
+    
+    # Configure page
+    st.set_page_config(page_title="Prompt Hacking Challenge", layout="wide")
+    st.markdown(GLOBAL_CSS, unsafe_allow_html=True)
+    start_metrics_server()
+    with span("rerun", page=st.session_state.get("page", "rules")):
+        main()
@@ -0,0 +1,273 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from sortedcontainers import SortedList
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock, fall back to in-process locking only
+    fcntl = None
+
+SNAPSHOT_FILE = "leaderboard.json"
+COMPACT_EVERY = 500
+# Compact once the log holds this fraction of the snapshot, so rewriting it stays O(1) per write
+COMPACT_RATIO = 0.25
+REFRESH_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def rank_key(entry):
+    """Ranking order used everywhere: highest level first, then fewest attempts"""
+    return (-entry["level"], entry["attempts"])
+
+
+class _FileLock:
+    """Advisory lock on the event log so several processes can share it"""
+
+    def __init__(self, path, exclusive, blocking=True):
+        self.path = path
+        self.exclusive = exclusive
+        self.blocking = blocking
+        self._file = None
+
+    def __enter__(self):
+        """Take the lock; raises BlockingIOError if it is held and ``blocking`` is False"""
+        self._file = open(self.path, "a+")
+        if fcntl is not None:
+            operation = fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.flock(self._file, operation if self.blocking else operation | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._file.close()
+                raise
+        return self._file
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+class LeaderboardStore:
+    """Append-only leaderboard log with an in-memory ranked index
+
+    Every entry is appended as one JSON line to the event log and inserted
+    into a SortedList keyed by (-level, attempts, seq), O(log n) per entry,
+    so writes never rewrite the whole file and top-k reads are a slice.
+    Once the log holds ``compact_every`` events and at least a quarter as
+    many as the snapshot, a background thread folds it into the snapshot
+    file, which is replaced atomically. The snapshot keeps the legacy
+    ``leaderboard.json`` format (a ranked list of entries), so existing
+    files load unchanged. Reads never wait on the file lock: if another
+    process holds it, they serve what is in memory and look again later.
+    """
+
+    def __init__(self, snapshot_path=SNAPSHOT_FILE, log_path=None, compact_every=COMPACT_EVERY,
+                 refresh_interval=REFRESH_INTERVAL):
+        self.snapshot_path = Path(snapshot_path)
+        self.log_path = Path(log_path) if log_path else self.snapshot_path.with_suffix(".log")
+        self.compact_every = compact_every
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self._next_refresh = 0.0
+        self._views = {}
+        self._lock = threading.RLock()
+        self._index = SortedList()
+        self._seq = 0
+        self._log_offset = 0
+        self._log_events = 0
+        self._snapshot_stamp = None
+        self._snapshot_size = 0
+        self._compact_wanted = threading.Event()
+        with self._lock, _FileLock(self.log_path, exclusive=False):
+            self._reload()
+        threading.Thread(target=self._run_compactor, name="leaderboard-compactor", daemon=True).start()
+
+    def __len__(self):
+        with self._lock:
+            self._catch_up()
+            return len(self._index)
+
+    def _stat_stamp(self, path):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _insert(self, entry):
+        # seq makes keys unique, so the entry dicts are never compared
+        self._index.add((rank_key(entry) + (self._seq,), entry))
+        self._seq += 1
+
+    def _head(self, k=None):
+        return [entry for _, entry in self._index.islice(0, k)]
+
+    def _reload(self):
+        """Rebuild the index from the snapshot and the full event log"""
+        self._index = SortedList()
+        self._seq = 0
+        self._log_offset = 0
+        self._log_events = 0
+        self._snapshot_stamp = self._stat_stamp(self.snapshot_path)
+        if self._snapshot_stamp is not None:
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            for entry in snapshot:
+                self._insert(entry)
+            self._snapshot_size = len(snapshot)
+        self._read_log()
+        self.version += 1
+
+    def _read_log(self):
+        """Ingest complete lines appended to the log since the last read"""
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        end = data.rfind(b"\n") + 1
+        count = 0
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._insert(json.loads(line))
+                count += 1
+        self._log_offset += end
+        self._log_events += count
+        return count
+
+    def _catch_up(self, locked=False):
+        """Pick up writes and compactions made by other processes"""
+        if not locked:
+            # Reads only stat the files once per refresh interval; our own
+            # writes update the index directly and need no refresh
+            now = time.monotonic()
+            if now < self._next_refresh:
+                return
+            self._next_refresh = now + self.refresh_interval
+        snapshot_stamp = self._stat_stamp(self.snapshot_path)
+        log_stamp = self._stat_stamp(self.log_path)
+        log_size = log_stamp[2] if log_stamp else 0
+        if snapshot_stamp == self._snapshot_stamp and log_size == self._log_offset:
+            return
+        if not locked:
+            lock = _FileLock(self.log_path, exclusive=False, blocking=False)
+            try:
+                lock.__enter__()
+            except BlockingIOError:
+                # A writer or a compaction holds the log; serve what we have and look again next interval
+                return
+            try:
+                return self._catch_up(locked=True)
+            finally:
+                lock.__exit__(None, None, None)
+        log_stamp = self._stat_stamp(self.log_path)
+        log_size = log_stamp[2] if log_stamp else 0
+        if self._stat_stamp(self.snapshot_path) != self._snapshot_stamp or log_size < self._log_offset:
+            self._reload()
+        elif self._read_log():
+            self.version += 1
+
+    def add(self, entry):
+        """Append one entry to the log and the ranked index"""
+        self.add_many([entry])
+
+    def add_many(self, entries):
+        """Append entries to the log in one write under a single lock"""
+        if not entries:
+            return
+        data = "".join(json.dumps(entry) + "\n" for entry in entries)
+        # The file lock is always taken before self._lock, so readers never wait behind a compaction
+        with _FileLock(self.log_path, exclusive=True) as log:
+            with self._lock:
+                self._catch_up(locked=True)
+                log.write(data)
+                log.flush()
+                for entry in entries:
+                    self._insert(entry)
+                self._log_offset += len(data.encode())
+                self._log_events += len(entries)
+                self.version += 1
+                compact = (self._log_events >= self.compact_every
+                           and self._log_events >= COMPACT_RATIO * self._snapshot_size)
+        if compact:
+            self._compact_wanted.set()
+
+    def top(self, k=10):
+        """Return the k best entries in rank order"""
+        with self._lock:
+            self._catch_up()
+            return self._head(k)
+
+    def entries(self):
+        """Return every entry in rank order"""
+        with self._lock:
+            self._catch_up()
+            return self._head()
+
+    def cached_view(self, name, k, builder):
+        """Return builder(top k entries), rebuilt only when the store changes
+
+        The result is shared by every caller in the process until the next
+        write bumps ``version``, so repeated reads do no I/O or rebuilding.
+        """
+        with self._lock:
+            self._catch_up()
+            cached = self._views.get((name, k))
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            view = builder(self._head(k))
+            self._views[(name, k)] = (self.version, view)
+            return view
+
+    def _run_compactor(self):
+        while True:
+            self._compact_wanted.wait()
+            self._compact_wanted.clear()
+            try:
+                self.compact()
+            except Exception:
+                logger.exception("Leaderboard compaction failed; will retry after the next write")
+
+    def compact(self):
+        """Fold the event log into the snapshot file
+
+        Writers in every process wait on the file lock meanwhile, but reads
+        only need the in-memory index, which is held just long enough to copy.
+        """
+        with _FileLock(self.log_path, exclusive=True) as log:
+            with self._lock:
+                self._catch_up(locked=True)
+                entries = self._head()
+            tmp_path = self.snapshot_path.with_name(f".{self.snapshot_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            log.truncate(0)
+            log.flush()
+            with self._lock:
+                self._snapshot_stamp = self._stat_stamp(self.snapshot_path)
+                self._snapshot_size = len(entries)
+                self._log_offset = 0
+                self._log_events = 0
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(snapshot_path=SNAPSHOT_FILE):
+    """Return the process-wide store for a snapshot file"""
+    key = os.path.abspath(snapshot_path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = LeaderboardStore(snapshot_path)
+        return _stores[key]
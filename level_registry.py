@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+
+from llm_backends import cached_system_blocks
+from prompt_builder import completion_prefix
+
+CHECK_INTERVAL = float(os.getenv("LEVELS_CHECK_INTERVAL", "1.0"))
+REQUIRED_FIELDS = ("name", "objective", "system_prompt", "success_condition", "hint", "max_attempts")
+
+logger = logging.getLogger(__name__)
+
+
+def compile_level(number, level):
+    """Validate one level and add the fields derived from it once per load"""
+    missing = [field for field in REQUIRED_FIELDS if field not in level]
+    if missing:
+        raise ValueError(f"Level {number} is missing {', '.join(missing)}")
+    compiled = dict(level)
+    # Metrics label levels by number, like the game does
+    compiled["number"] = int(number)
+    compiled["max_attempts"] = int(level["max_attempts"])
+    compiled["success_folded"] = level["success_condition"].casefold()
+    compiled["system_blocks"] = cached_system_blocks(level)
+    compiled["completion_prefix"] = completion_prefix(level)
+    return compiled
+
+
+def load_levels(path):
+    """Parse and compile a levels file: a JSON object of level number -> level"""
+    with open(path, "r") as f:
+        raw = json.load(f)
+    levels = {int(number): compile_level(number, level) for number, level in raw.items()}
+    if sorted(levels) != list(range(1, len(levels) + 1)):
+        raise ValueError(f"Levels must be numbered 1..{len(levels)}, got {sorted(levels)}")
+    return levels
+
+
+class LevelRegistry(Mapping):
+    """Levels loaded from a JSON file and reloaded when it changes
+
+    Reads cost a dictionary lookup; at most once per ``check_interval``
+    seconds one of them stats the file, and a changed mtime or size
+    triggers a reparse. The new levels are compiled off to the side and
+    swapped in with a single assignment, and the dict ``current()`` returns
+    is never changed afterwards. Every lookup on the registry itself may
+    reload, so code that must see one consistent set for a whole rerun or
+    turn takes a ``current()`` snapshot and uses that. A file that fails to
+    parse or validate is logged and the previous levels stay in place.
+    """
+
+    def __init__(self, path, check_interval=CHECK_INTERVAL):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self.version = 0
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._stamp = self._stat()
+        self._levels = load_levels(self.path)
+
+    def _stat(self):
+        stat = self.path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def current(self):
+        """The current levels; reloads the file if it changed since the last check"""
+        now = time.monotonic()
+        if now >= self._next_check and self._lock.acquire(blocking=False):
+            try:
+                self._next_check = now + self.check_interval
+                self._reload_if_changed()
+            finally:
+                self._lock.release()
+        return self._levels
+
+    def _reload_if_changed(self):
+        try:
+            stamp = self._stat()
+        except OSError:
+            return  # Mid-replace; look again next interval
+        if stamp == self._stamp:
+            return
+        # Remember the stamp either way so a broken file is reported once, not every interval
+        self._stamp = stamp
+        try:
+            levels = load_levels(self.path)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning("Keeping the current levels; could not reload %s: %s", self.path, e)
+            return
+        self._levels = levels
+        self.version += 1
+
+    def __getitem__(self, number):
+        return self.current()[number]
+
+    def __iter__(self):
+        return iter(self.current())
+
+    def __len__(self):
+        return len(self.current())
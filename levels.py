@@ -0,0 +1,12 @@
+import os
+from pathlib import Path
+
+from level_registry import LevelRegistry
+
+# Game levels live in JSON files beside this module and are reloaded when edited
+LEVELS_DIR = Path(__file__).resolve().parent
+
+LEVELS = LevelRegistry(os.getenv("LEVELS_FILE", LEVELS_DIR / "levels.json"))
+
+# Level variants played by app_aws.py
+AWS_LEVELS = LevelRegistry(os.getenv("AWS_LEVELS_FILE", LEVELS_DIR / "levels_aws.json"))
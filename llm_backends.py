@@ -0,0 +1,394 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+from llm_clients import concurrency_slot, get_anthropic_client, get_bedrock_llm
+from metrics import HEDGED_CALLS, PROMPT_CACHE, TOKENS
+from prompt_builder import PrefixCache, completion_prefix, format_transcript
+
+ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-sonnet-20240229")
+BEDROCK_MODEL = os.getenv("BEDROCK_MODEL", "anthropic.claude-3-sonnet-20240229-v1:0")
+AWS_REGION = os.getenv("AWS_REGION", "eu-west-1")
+MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1024"))
+HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "2.0"))
+HEDGE_MIN_DELAY = 0.25
+HEDGE_MIN_SAMPLES = 20
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+STUB_WORDS = "Arr matey that be a fine question but I cannot help ye with that one".split()
+
+
+class Backend:
+    """A model provider; ``stream`` yields the response text in chunks
+
+    ``messages`` are the conversation turns to send (see
+    prompt_builder.build_messages), ending with the new user input. Closing
+    the returned generator must cancel the upstream request.
+    """
+
+    name = None
+
+    def stream(self, level, messages):
+        raise NotImplementedError
+
+
+def cached_system_blocks(level):
+    """Messages API system prompt marked as a cacheable prefix"""
+    return [{"type": "text", "text": level["system_prompt"], "cache_control": {"type": "ephemeral"}}]
+
+
+class AnthropicBackend(Backend):
+    """Claude via the Messages API with prompt caching, or text completions on older SDKs
+
+    The static system prompt is sent as a cache_control block so the
+    provider can reuse its prefix across attempts; the blocks themselves are
+    built once per level. The pinned anthropic 0.3.x SDK only offers text
+    completions, which have no provider-side prefix caching; that path still
+    reuses the per-level completion prefix. Provider cache reads are counted
+    per level in prompt_prefix_cache_total and llm_tokens_total.
+    """
+
+    name = "anthropic"
+
+    def __init__(self, model=ANTHROPIC_MODEL, max_tokens=MAX_TOKENS):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.prefixes = PrefixCache()
+
+    def stream(self, level, messages):
+        client = get_anthropic_client()
+        if hasattr(client, "messages"):
+            yield from self._stream_messages(client, level, messages)
+        else:
+            yield from self._stream_completion(client, level, messages)
+
+    def _stream_messages(self, client, level, messages):
+        system = self.prefixes.get(level, "system_blocks", cached_system_blocks)
+        with concurrency_slot():
+            stream = client.messages.create(
+                model=self.model,
+                max_tokens=self.max_tokens,
+                system=system,
+                messages=messages,
+                stream=True
+            )
+            try:
+                for event in stream:
+                    if event.type == "message_start":
+                        cached = getattr(event.message.usage, "cache_read_input_tokens", None) or 0
+                        PROMPT_CACHE.inc(level=level["number"], source="provider", result="hit" if cached else "miss")
+                        TOKENS.inc(cached, level=level["number"], kind="cache_read")
+                    elif event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                        yield event.delta.text
+            finally:
+                stream.response.close()
+
+    def _stream_completion(self, client, level, messages):
+        from anthropic import AI_PROMPT, HUMAN_PROMPT
+
+        with concurrency_slot():
+            stream = client.completions.create(
+                model=self.model,
+                max_tokens_to_sample=self.max_tokens,
+                prompt=format_transcript(
+                    self.prefixes.get(level, "completion_prefix", completion_prefix), messages, HUMAN_PROMPT, AI_PROMPT
+                ),
+                stream=True
+            )
+            try:
+                for completion in stream:
+                    yield completion.completion
+            finally:
+                # Closing the response drops the connection, which stops the generation upstream
+                stream.response.close()
+
+
+class BedrockBackend(Backend):
+    name = "bedrock"
+
+    def __init__(self, model=BEDROCK_MODEL, region=AWS_REGION):
+        self.model = model
+        self.region = region
+        self.prefixes = PrefixCache()
+
+    def stream(self, level, messages):
+        prompt = format_transcript(self.prefixes.get(level, "completion_prefix", completion_prefix), messages)
+        with concurrency_slot():
+            responses = get_bedrock_llm(self.model, self.region).stream_complete(prompt)
+            try:
+                for response in responses:
+                    yield response.delta
+            finally:
+                # Propagate cancellation into the llama_index generator so it stops reading the event stream
+                responses.close()
+
+
+class StubBackend(Backend):
+    """Deterministic local backend for offline benchmarking
+
+    Scripted rules (a JSON list of ``{"match": ..., "response": ...}``, with
+    an optional ``"level"`` name) are tried first. Otherwise a filler reply
+    of ``response_tokens`` words is generated from a seed derived from the
+    prompt, and with probability ``solve_rate`` it contains the level's
+    success condition. Output is paced by ``ttft`` and ``tokens_per_second``.
+    """
+
+    name = "stub"
+
+    def __init__(self, script=None, ttft=0.2, tokens_per_second=50.0, response_tokens=40,
+                 solve_rate=0.0, seed=0):
+        self.rules = []
+        if script:
+            with open(script, "r") as f:
+                self.rules = json.load(f)
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.solve_rate = solve_rate
+        self.seed = seed
+
+    def respond(self, level, messages):
+        """Return the full response the stub will stream"""
+        user_input = messages[-1]["content"]
+        folded = user_input.casefold()
+        for rule in self.rules:
+            if rule.get("level") not in (None, level["name"]):
+                continue
+            if rule.get("match", "").casefold() in folded:
+                return rule["response"]
+        rng = random.Random(f"{self.seed}:{level['system_prompt']}:{user_input}")
+        words = [rng.choice(STUB_WORDS) for _ in range(self.response_tokens)]
+        if rng.random() < self.solve_rate:
+            words.insert(rng.randrange(len(words) + 1), level["success_condition"])
+        return " ".join(words)
+
+    def stream(self, level, messages):
+        words = self.respond(level, messages).split(" ")
+        time.sleep(self.ttft)
+        for index, word in enumerate(words):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield word if index == len(words) - 1 else word + " "
+
+
+class CircuitOpen(Exception):
+    """Raised when every backend a call could use has its circuit breaker open"""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one backend
+
+    ``failure_threshold`` consecutive failures open the circuit; after
+    ``reset_timeout`` seconds one probe call is let through (half-open) and
+    its outcome closes or reopens it.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open":
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    HEDGED_CALLS.inc(backend=self.name, outcome="breaker_open")
+                self.state = "open"
+                self._opened = time.monotonic()
+
+    def release(self):
+        """Forget a call that was cancelled before it could succeed or fail"""
+        with self._lock:
+            self._probing = False
+
+
+class _Call:
+    """One backend's stream pumped on its own thread into a shared queue"""
+
+    def __init__(self, name, backend, level, messages, events):
+        self.name = name
+        self.cancelled = threading.Event()
+        self.started = time.monotonic()
+        threading.Thread(
+            target=self._pump, args=(backend, level, messages, events), name=f"hedge-{name}", daemon=True
+        ).start()
+
+    def _pump(self, backend, level, messages, events):
+        chunks = backend.stream(level, messages)
+        first = True
+        try:
+            for chunk in chunks:
+                if first:
+                    events.put((self, "first", time.monotonic() - self.started))
+                    first = False
+                if self.cancelled.is_set():
+                    return
+                events.put((self, "chunk", chunk))
+            events.put((self, "done", None))
+        except Exception as e:
+            events.put((self, "error", e))
+        finally:
+            # Runs on this thread, so closing cancels the upstream request like a normal close
+            chunks.close()
+
+
+class HedgedBackend(Backend):
+    """Primary backend with a hedged secondary and a circuit breaker per backend
+
+    The primary is called first. If it has not produced a first token after
+    its observed p95 time-to-first-token (``hedge_delay`` until enough
+    samples exist), the same request is sent to the secondary; whichever
+    streams first wins and the other is cancelled. A primary that fails
+    before its first token fails over to the secondary at once, and a
+    backend whose breaker is open is skipped. Once a winner has streamed
+    text, its errors are raised as they are. Cancelling a call that is still
+    waiting for its first token takes effect when that token arrives.
+    """
+
+    name = "hedged"
+
+    def __init__(self, primary="anthropic", secondary="bedrock", hedge_delay=HEDGE_DELAY):
+        self.primary = primary
+        self.secondary = secondary
+        self.hedge_delay = hedge_delay
+        self.breakers = {name: CircuitBreaker(name) for name in (primary, secondary)}
+        self.first_token_times = {name: deque(maxlen=256) for name in (primary, secondary)}
+
+    def delay(self):
+        """How long to wait for the primary's first token before hedging"""
+        samples = sorted(self.first_token_times[self.primary])
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return self.hedge_delay
+        return max(HEDGE_MIN_DELAY, samples[int(0.95 * (len(samples) - 1))])
+
+    def _launch(self, name, level, messages, events, calls, outcome=None):
+        if not self.breakers[name].allow():
+            return False
+        if outcome is not None:
+            HEDGED_CALLS.inc(backend=name, outcome=outcome)
+        # Backends are resolved here rather than in __init__, which runs under get_backend's lock
+        calls[name] = _Call(name, get_backend(name), level, messages, events)
+        return True
+
+    def stream(self, level, messages):
+        events = queue.Queue()
+        calls = {}
+        if not self._launch(self.primary, level, messages, events, calls):
+            if not self._launch(self.secondary, level, messages, events, calls, "failover"):
+                raise CircuitOpen("All model backends are temporarily unavailable. Please try again shortly.")
+        hedge_at = time.monotonic() + self.delay() if self.primary in calls else None
+        winner = None
+        errors = {}
+        try:
+            while True:
+                timeout = None
+                if hedge_at is not None:
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                try:
+                    call, kind, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    hedge_at = None
+                    self._launch(self.secondary, level, messages, events, calls, "hedged")
+                    continue
+                if kind == "first":
+                    self.first_token_times[call.name].append(value)
+                    continue
+                if winner is not None and call is not winner:
+                    continue
+                if kind == "error":
+                    self.breakers[call.name].record_failure()
+                    if winner is not None:
+                        raise value
+                    errors[call.name] = value
+                    if call.name == self.primary:
+                        hedge_at = None
+                        if self.secondary not in calls:
+                            self._launch(self.secondary, level, messages, events, calls, "failover")
+                    if all(name in errors for name in calls):
+                        raise errors.get(self.primary, value)
+                    continue
+                if winner is None:
+                    # A backend that streams is healthy, even if the player's stream is cut short
+                    winner = call
+                    hedge_at = None
+                    self.breakers[call.name].record_success()
+                    HEDGED_CALLS.inc(backend=call.name, outcome="won")
+                if kind == "done":
+                    return
+                yield value
+        finally:
+            for call in calls.values():
+                call.cancelled.set()
+                if call is not winner and call.name not in errors:
+                    self.breakers[call.name].release()
+
+
+def _stub_from_env():
+    return StubBackend(
+        script=os.getenv("STUB_SCRIPT"),
+        ttft=float(os.getenv("STUB_TTFT", "0.2")),
+        tokens_per_second=float(os.getenv("STUB_TOKENS_PER_SECOND", "50")),
+        response_tokens=int(os.getenv("STUB_RESPONSE_TOKENS", "40")),
+        solve_rate=float(os.getenv("STUB_SOLVE_RATE", "0")),
+        seed=int(os.getenv("STUB_SEED", "0")),
+    )
+
+
+def _hedged_from_env():
+    return HedgedBackend(
+        primary=os.getenv("LLM_PRIMARY", "anthropic"),
+        secondary=os.getenv("LLM_SECONDARY", "bedrock"),
+    )
+
+
+BACKENDS = {
+    "anthropic": AnthropicBackend,
+    "bedrock": BedrockBackend,
+    "stub": _stub_from_env,
+    "hedged": _hedged_from_env,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name=None, default="anthropic"):
+    """Return the process-wide backend named by ``name``, LLM_BACKEND or ``default``"""
+    name = name or os.getenv("LLM_BACKEND") or default
+    with _backends_lock:
+        if name not in _backends:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown LLM backend {name!r}; expected one of {sorted(BACKENDS)}")
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
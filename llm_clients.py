@@ -0,0 +1,80 @@
+import os
+import threading
+from contextlib import contextmanager
+
+# Shared by every session in the process; tune per deployment
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+
+_clients = {}
+_clients_lock = threading.Lock()
+_concurrency = threading.BoundedSemaphore(MAX_CONCURRENCY)
+
+
+def _shared(name, factory):
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+
+def get_anthropic_client():
+    """Return the process-wide Anthropic client with a bounded keep-alive pool"""
+
+    def create():
+        import httpx
+        from anthropic import Anthropic
+
+        return Anthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            connection_pool_limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+
+    return _shared("anthropic", create)
+
+
+def get_bedrock_client(region):
+    """Return the process-wide bedrock-runtime client for a region"""
+
+    def create():
+        import boto3
+        from botocore.config import Config
+
+        return boto3.client(
+            service_name="bedrock-runtime",
+            region_name=region,
+            config=Config(max_pool_connections=MAX_CONNECTIONS, retries={"mode": "adaptive"})
+        )
+
+    return _shared(f"bedrock:{region}", create)
+
+
+def get_bedrock_llm(model, region, temperature=0.1):
+    """Return the process-wide llama_index Bedrock LLM for a model"""
+    # Resolved outside _shared: its lock is not reentrant
+    client = get_bedrock_client(region)
+
+    def create():
+        from llama_index.llms.bedrock import Bedrock
+
+        return Bedrock(
+            model=model,
+            client=client,
+            streaming=True,
+            model_kwargs={
+                "temperature": temperature
+            }
+        )
+
+    return _shared(f"bedrock-llm:{region}:{model}:{temperature}", create)
+
+
+@contextmanager
+def concurrency_slot():
+    """Hold one of the MAX_CONCURRENCY process-wide model call slots"""
+    with _concurrency:
+        yield
@@ -0,0 +1,175 @@
+import bisect
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Fraction of spans written to the trace file; histograms always see every span
+TRACE_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "0.01"))
+TRACE_FILE = os.getenv("METRICS_TRACE_FILE")
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; an observation is one bisect and one locked update"""
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_label_text(key + (('le', le),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_label_text(key)} {total}")
+                lines.append(f"{self.name}_count{_label_text(key)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("game_stage_seconds", "Time spent in each stage of a turn")
+QUEUE_WAIT_SECONDS = Histogram("llm_queue_wait_seconds", "Time model calls wait in the scheduler queue")
+TOKENS = Counter("llm_tokens_total", "Estimated prompt and generated tokens per level")
+CACHE_REQUESTS = Counter("response_cache_requests_total", "Response cache lookups by level and result")
+PROMPT_CACHE = Counter("prompt_prefix_cache_total", "Prompt prefix reuse per level, locally and at the provider")
+HEDGED_CALLS = Counter("llm_hedged_calls_total", "Hedges, failovers, wins and breaker trips per backend")
+
+REGISTRY = [STAGE_SECONDS, QUEUE_WAIT_SECONDS, TOKENS, CACHE_REQUESTS, PROMPT_CACHE, HEDGED_CALLS]
+
+_trace_lock = threading.Lock()
+_trace_file = None
+
+
+def _trace(record):
+    global _trace_file
+    with _trace_lock:
+        if _trace_file is None:
+            _trace_file = open(TRACE_FILE, "a", buffering=1)
+        _trace_file.write(json.dumps(record) + "\n")
+
+
+@contextmanager
+def span(stage, **labels):
+    """Time a block into game_stage_seconds and, when sampled, the trace file"""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage, **labels)
+        if TRACE_FILE and random.random() < TRACE_SAMPLE_RATE:
+            _trace({"ts": time.time(), "stage": stage, "seconds": elapsed, **labels})
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) for cost accounting"""
+    return (len(text) + 3) // 4
+
+
+def count_stream_tokens(chunks, level):
+    """Pass a response stream through, counting one generated token per chunk"""
+    count = 0
+    try:
+        for chunk in chunks:
+            count += 1
+            yield chunk
+    finally:
+        chunks.close()
+        TOKENS.inc(count, level=level, kind="output")
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve /metrics on a background thread, once per process, when a port is configured"""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
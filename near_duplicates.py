@@ -0,0 +1,302 @@
+"""Near-duplicate prompt index (MinHash + LSH) per level
+
+Run as a script to list the attack families in a persisted index:
+
+    PROMPT_INDEX_PATH=prompt_index python near_duplicates.py [--top 10]
+"""
+import argparse
+import atexit
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from response_cache import normalize_prompt, prompt_hash
+
+FUZZY_REUSE = os.getenv("FUZZY_CACHE", "0") == "1"
+FUZZY_THRESHOLD = float(os.getenv("FUZZY_CACHE_THRESHOLD", "0.9"))
+CLUSTER_THRESHOLD = 0.6
+INDEX_CAPACITY = int(os.getenv("PROMPT_INDEX_CAPACITY", "5000"))
+INDEX_PATH = os.getenv("PROMPT_INDEX_PATH")
+# Indexing costs a MinHash per turn, so it only runs for fuzzy reuse or persisted attack-family analytics
+INDEX_ENABLED = FUZZY_REUSE or INDEX_PATH is not None
+INDEX_MAX_BYTES = int(os.getenv("PROMPT_INDEX_MAX_BYTES", str(4 * 1024 * 1024)))
+MAX_TEXT_CHARS = int(os.getenv("PROMPT_INDEX_MAX_CHARS", "4096"))
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_CHARS = 5
+_MODULUS = (1 << 32) - 5
+
+
+class MinHasher:
+    """MinHash signatures over character shingles of normalized text"""
+
+    def __init__(self, num_perm=NUM_PERM, shingle_chars=SHINGLE_CHARS, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _MODULUS, num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, _MODULUS, num_perm, dtype=np.uint64)[:, None]
+        self.shingle_chars = shingle_chars
+
+    def signature(self, text):
+        # Long pastes keep only their end (the latest input): the hash matrix grows with the shingles
+        text = normalize_prompt(text[-MAX_TEXT_CHARS:])
+        k = self.shingle_chars
+        shingles = {text[i:i + k] for i in range(max(1, len(text) - k + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((self.a * hashes + self.b) % _MODULUS).min(axis=1).astype(np.uint32)
+
+
+def _size(text, response):
+    return len(text) + len(response or "")
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class LSHIndex:
+    """Bounded LSH index of prompts with the response each one got
+
+    Signatures live in a ``capacity`` x ``num_perm`` array. With a ``path``
+    it starts as a private copy-on-write memmap of ``path``.npy, so workers
+    sharing the directory never write into each other's slots; ``save``
+    replaces ``path``.npy and the entries in ``path``.json each atomically.
+    The two files are not replaced together, so each entry records a
+    checksum of its signature and on load is kept only if the signature
+    file still holds that signature in its slot.
+    Each signature is split into ``bands`` bands that are hashed into
+    buckets, so a lookup only compares against prompts sharing a bucket.
+    Entries keep the last MAX_TEXT_CHARS of their text and are evicted least
+    recently used once there are ``capacity`` of them or their text and
+    responses exceed ``max_bytes``. A longer text is only hashed by its
+    end, so it still joins a family but its response is not kept for reuse. Every prompt joins the cluster
+    (attack family) of its nearest entry at or above CLUSTER_THRESHOLD
+    similarity, or starts a new one.
+    """
+
+    def __init__(self, hasher, capacity=INDEX_CAPACITY, bands=BANDS, path=None, max_bytes=INDEX_MAX_BYTES):
+        self.hasher = hasher
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.bands = bands
+        self.num_perm = len(hasher.a)
+        self.rows = self.num_perm // bands
+        self.path = Path(path) if path else None
+        self.next_cluster = 0
+        # slot -> [text, response, cluster, hits], least recently used first
+        self._entries = OrderedDict()
+        self._buckets = [defaultdict(set) for _ in range(bands)]
+        self._lock = threading.Lock()
+        shape = (capacity, self.num_perm)
+        npy = self.path.with_suffix(".npy") if self.path is not None else None
+        if npy is None or not npy.exists():
+            self._signatures = np.zeros(shape, dtype=np.uint32)
+        else:
+            self._signatures = np.load(npy, mmap_mode="c")
+            # An existing file keeps the capacity it was created with
+            self.capacity = len(self._signatures)
+            self._load()
+        self._free = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in self._entries]
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _nearest(self, signature, threshold):
+        candidates = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        if not candidates:
+            return None
+        slots = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+        scores = np.count_nonzero(self._signatures[slots] == signature, axis=1) / self.num_perm
+        best = int(scores.argmax())
+        return (float(scores[best]), int(slots[best])) if scores[best] >= threshold else None
+
+    def lookup(self, text, threshold=FUZZY_THRESHOLD):
+        """Return (response, similarity) of the closest stored prompt at or above threshold, or None"""
+        if len(text) > MAX_TEXT_CHARS:
+            return None  # Only its end would be compared, which can't vouch for the whole conversation
+        signature = self.hasher.signature(text)
+        with self._lock:
+            best = self._nearest(signature, threshold)
+            if best is None:
+                return None
+            score, slot = best
+            entry = self._entries[slot]
+            if entry[1] is None:
+                return None
+            entry[3] += 1
+            self._entries.move_to_end(slot)
+            return entry[1], score
+
+    def add(self, text, response):
+        """Store a prompt and its response; returns the prompt's cluster id"""
+        signature = self.hasher.signature(text)
+        if len(text) > MAX_TEXT_CHARS:
+            text, response = text[-MAX_TEXT_CHARS:], None
+        with self._lock:
+            best = self._nearest(signature, CLUSTER_THRESHOLD)
+            if best is not None and best[0] == 1.0:
+                entry = self._entries[best[1]]
+                self.bytes += _size("", response) - _size("", entry[1])
+                entry[1] = response
+                entry[3] += 1
+                self._entries.move_to_end(best[1])
+                self._trim()
+                return entry[2]
+            if best is not None:
+                cluster = self._entries[best[1]][2]
+            else:
+                cluster = self.next_cluster
+                self.next_cluster += 1
+            if not self._free:
+                self._evict(next(iter(self._entries)))
+            slot = self._free.pop()
+            self._signatures[slot] = signature
+            self._index(slot)
+            self._entries[slot] = [text, response, cluster, 1]
+            self.bytes += _size(text, response)
+            self._trim()
+            return cluster
+
+    def _trim(self):
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            self._evict(next(iter(self._entries)))
+
+    def _index(self, slot):
+        for bucket, key in zip(self._buckets, self._band_keys(self._signatures[slot])):
+            bucket[key].add(slot)
+
+    def _evict(self, slot):
+        for bucket, key in zip(self._buckets, self._band_keys(self._signatures[slot])):
+            members = bucket[key]
+            members.discard(slot)
+            if not members:
+                del bucket[key]
+        text, response = self._entries.pop(slot)[:2]
+        self.bytes -= _size(text, response)
+        self._free.append(slot)
+
+    def clusters(self):
+        """Attack families among live entries, largest first: (cluster, hits, prompts, example)"""
+        with self._lock:
+            groups = defaultdict(list)
+            for text, _, cluster, hits in self._entries.values():
+                groups[cluster].append((hits, text))
+        summary = [
+            (cluster, sum(hits for hits, _ in members), len(members), max(members)[1])
+            for cluster, members in groups.items()
+        ]
+        return sorted(summary, key=lambda row: -row[1])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        meta = self.path.with_suffix(".json")
+        if not meta.exists():
+            return
+        with open(meta, "r") as f:
+            state = json.load(f)
+        self.next_cluster = state["next_cluster"]
+        for slot, text, response, cluster, hits, checksum in state["entries"]:
+            # A crash or another worker's save between the two files can pair a slot with the wrong text
+            if slot < self.capacity and zlib.crc32(self._signatures[slot].tobytes()) == checksum:
+                self._entries[slot] = [text, response, cluster, hits]
+                self.bytes += _size(text, response)
+                self._index(slot)
+
+    def save(self):
+        """Atomically rewrite the signature file, then the entry file"""
+        if self.path is None:
+            return
+        with self._lock:
+            signatures = np.array(self._signatures)
+            state = {
+                "next_cluster": self.next_cluster,
+                "entries": [
+                    [slot, *entry, zlib.crc32(signatures[slot].tobytes())] for slot, entry in self._entries.items()
+                ],
+            }
+        npy = self.path.with_suffix(".npy")
+        tmp_path = npy.with_name(f".{npy.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, signatures)
+        os.replace(tmp_path, npy)
+        meta = self.path.with_suffix(".json")
+        tmp_path = meta.with_name(f".{meta.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, meta)
+
+
+class PromptIndex:
+    """One LSHIndex per level and system prompt, so an edited prompt starts afresh"""
+
+    def __init__(self, capacity=INDEX_CAPACITY, path=INDEX_PATH):
+        self.capacity = capacity
+        self.path = Path(path) if path else None
+        self.hasher = MinHasher()
+        self._indexes = {}
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            atexit.register(self.save)
+
+    def index(self, level, system_prompt):
+        key = f"{level}-{prompt_hash(system_prompt)}"
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                path = self.path / key if self.path is not None else None
+                index = self._indexes[key] = LSHIndex(self.hasher, self.capacity, path=path)
+            return index
+
+    def lookup(self, level, system_prompt, text, threshold=FUZZY_THRESHOLD):
+        return self.index(level, system_prompt).lookup(text, threshold)
+
+    def add(self, level, system_prompt, text, response):
+        return self.index(level, system_prompt).add(text, response)
+
+    def save(self):
+        with self._lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            index.save()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_prompt_index():
+    """Return the process-wide prompt index; callers check INDEX_ENABLED first"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PromptIndex()
+        return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=INDEX_PATH, required=INDEX_PATH is None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    hasher = MinHasher()
+    for meta in sorted(Path(args.path).glob("*.json")):
+        index = LSHIndex(hasher, INDEX_CAPACITY, path=meta.with_suffix(""))
+        print(f"{meta.stem}: {len(index)} prompts")
+        for cluster, hits, prompts, example in index.clusters()[:args.top]:
+            print(f"  family {cluster:>5} {hits:>7} attempts {prompts:>5} variants  {example[:70]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import threading
+
+from metrics import PROMPT_CACHE, estimate_tokens
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("PROMPT_HISTORY_TOKENS", "1500"))
+
+
+def message_tokens(message):
+    """Token estimate for a chat history message, computed once and cached on the message"""
+    if message.tokens is None:
+        message.tokens = estimate_tokens(message.content)
+    return message.tokens
+
+
+def build_messages(history, user_input, budget=HISTORY_TOKEN_BUDGET):
+    """Return the turns to send: recent history that fits the budget, then the new input
+
+    History is walked newest first one (user, assistant) exchange at a time
+    and stops at the first exchange that would overflow ``budget``, so the
+    work and the prompt size per turn stay bounded however long the level
+    runs. Exchanges whose answer was an error are skipped.
+    """
+    kept = []
+    used = 0
+    index = len(history) - 1
+    while index >= 1:
+        user, assistant = history[index - 1], history[index]
+        index -= 2
+        if user.role != "user" or assistant.role != "assistant":
+            continue
+        if assistant.content.startswith("Error:"):
+            continue
+        cost = message_tokens(user) + message_tokens(assistant)
+        if used + cost > budget:
+            break
+        used += cost
+        kept.append(assistant)
+        kept.append(user)
+    kept.reverse()
+    messages = [{"role": m.role, "content": m.content} for m in kept]
+    messages.append({"role": "user", "content": user_input})
+    return messages
+
+
+def format_transcript(prefix, messages, human_prompt="\n\nHuman:", ai_prompt="\n\nAssistant:"):
+    """Serialize a prebuilt prefix (see completion_prefix) and turns into a Human/Assistant completion prompt"""
+    turns = "".join(
+        f"{human_prompt if m['role'] == 'user' else ai_prompt} {m['content']}" for m in messages
+    )
+    return f"{prefix}{turns}{ai_prompt}"
+
+
+def completion_prefix(level):
+    """The part of a completion prompt that is the same for every attempt at a level"""
+    return level["system_prompt"]
+
+
+class PrefixCache:
+    """Request prefixes per level, serialized once and reused for every attempt
+
+    ``field`` names the kind of prefix (such as ``system_blocks``). A level
+    that arrives with that field already built, as levels from the
+    LevelRegistry do, uses it as is and is not counted; otherwise prefixes
+    are built on first use and kept, keyed on the level's name and system
+    prompt so an edited prompt gets a fresh one. Only those cache lookups
+    are counted per level in prompt_prefix_cache_total.
+    """
+
+    def __init__(self):
+        self._prefixes = {}
+        self._lock = threading.Lock()
+
+    def get(self, level, field, build):
+        prefix = level.get(field)
+        if prefix is not None:
+            return prefix
+        prefix = self._prefixes.get((field, level["name"], level["system_prompt"]))
+        if prefix is not None:
+            PROMPT_CACHE.inc(level=level["number"], source="local", result="hit")
+            return prefix
+        PROMPT_CACHE.inc(level=level["number"], source="local", result="miss")
+        with self._lock:
+            return self._prefixes.setdefault((field, level["name"], level["system_prompt"]), build(level))
@@ -0,0 +1,254 @@
+"""Run a corpus of attack prompts against every level, headless
+
+Each prompt is sent as a fresh single-turn attempt through the game's own
+path (game.stream_ai_response, as process_user_input uses it) and scored with
+the game's success check. Attempts run on a bounded thread pool and only a
+small window of the corpus is in flight, so corpora of any size stream
+through in constant memory. Every finished attempt is appended to the
+``--output`` JSON lines file straight away; that file is also the
+checkpoint, so rerunning the same command skips attempts already recorded
+for the current system prompts and retries the ones that failed.
+
+The corpus is a text file with one prompt per line (blank lines and lines
+starting with ``#`` are skipped) or JSON lines with a ``prompt`` field and
+optional ``id`` and ``levels`` fields.
+
+    python redteam.py attacks.txt [--levels AWS_LEVELS] [--level 3] \\
+        [--concurrency 16] [--output redteam_results.jsonl]
+
+    LLM_BACKEND=stub STUB_SOLVE_RATE=0.2 STUB_TTFT=0.05 python redteam.py attacks.txt
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import game
+import levels as level_sets
+from metrics import estimate_tokens
+from prompt_builder import build_messages
+from response_cache import prompt_hash
+from success_matcher import StreamMatcher
+
+DEFAULT_BACKENDS = {"LEVELS": "anthropic", "AWS_LEVELS": "bedrock"}
+PROGRESS_INTERVAL = 10.0
+
+
+class LevelStats:
+    def __init__(self):
+        self.attempts = 0
+        self.solved = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.seconds = []
+
+
+def read_corpus(path):
+    """Yield (prompt_id, prompt, levels or None) from a text or JSON lines corpus"""
+    jsonl = path.endswith((".jsonl", ".ndjson"))
+    with open(path, "r") as f:
+        for line in f:
+            if jsonl:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                prompt = record["prompt"]
+                yield str(record.get("id") or prompt_hash(prompt)), prompt, record.get("levels")
+            else:
+                prompt = line.rstrip("\n")
+                if prompt.strip() and not prompt.startswith("#"):
+                    yield prompt_hash(prompt), prompt, None
+
+
+def attempt_key(prompt_id, level, levels):
+    """Checkpoint key; editing a level's system prompt makes its earlier results stale"""
+    return prompt_id, level, prompt_hash(levels[level]["system_prompt"])
+
+
+def read_checkpoint(path):
+    """Successful rows already in the output file, by attempt key"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut short by an interrupted run
+            if row.get("error") is None:
+                done[(row["prompt_id"], row["level"], row["system"])] = row
+    return done
+
+
+def attack(prompt_id, prompt, level, stop_on_solve=True):
+    """One single-turn attempt; returns the result row"""
+    # One snapshot per attempt, in case the level file is reloaded meanwhile
+    levels = game.current_levels()
+    messages = build_messages([], prompt)
+    row = {
+        "prompt_id": prompt_id,
+        "level": level,
+        "system": prompt_hash(levels[level]["system_prompt"]),
+        "prompt": prompt,
+        "input_tokens": estimate_tokens(levels[level]["system_prompt"])
+        + sum(estimate_tokens(m["content"]) for m in messages),
+    }
+    matcher = StreamMatcher(levels[level]["success_folded"]) if stop_on_solve else None
+    parts = []
+    start = time.perf_counter()
+    try:
+        chunks = game.stream_ai_response(messages, level, levels)
+        try:
+            for delta in chunks:
+                parts.append(delta)
+                # Like the game, stop paying for tokens once the level is solved
+                if matcher is not None and matcher.feed(delta):
+                    break
+        finally:
+            chunks.close()
+    except Exception as e:
+        row["error"] = str(e)
+    response = "".join(parts)
+    row.update(
+        response=response,
+        solved=game.is_solved(level, prompt, response, levels) if "error" not in row else False,
+        output_tokens=len(parts),
+        seconds=round(time.perf_counter() - start, 4),
+    )
+    row.setdefault("error", None)
+    return row
+
+
+def add_row(stats, row):
+    s = stats[row["level"]]
+    if row["error"] is not None:
+        s.errors += 1
+        return
+    s.attempts += 1
+    s.solved += bool(row["solved"])
+    s.input_tokens += row["input_tokens"]
+    s.output_tokens += row["output_tokens"]
+    s.seconds.append(row["seconds"])
+
+
+def run(tasks, output, concurrency, stop_on_solve, on_row):
+    """Run (prompt_id, prompt, level) tasks, appending each result to ``output`` as it finishes"""
+    window = concurrency * 2
+    pending = set()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="redteam")
+    try:
+        with open(output, "a") as out:
+            for task in tasks:
+                pending.add(executor.submit(attack, *task, stop_on_solve))
+                if len(pending) >= window:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _write(out, finished, on_row)
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _write(out, finished, on_row)
+    finally:
+        # On Ctrl-C drop the queued attempts; a rerun picks them up from the checkpoint
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _write(out, finished, on_row):
+    for future in finished:
+        row = future.result()
+        out.write(json.dumps(row) + "\n")
+        on_row(row)
+    out.flush()
+
+
+def report(stats, elapsed, throughput):
+    print(f"{'level':>5} {'attempts':>9} {'solved':>7} {'rate':>7} {'errors':>7} "
+          f"{'in tokens':>10} {'out tokens':>10} {'p50 s':>7}")
+    for level in sorted(stats):
+        s = stats[level]
+        rate = s.solved / s.attempts if s.attempts else 0.0
+        p50 = f"{statistics.median(s.seconds):7.2f}" if s.seconds else f"{'n/a':>7}"
+        print(f"{level:>5} {s.attempts:>9} {s.solved:>7} {rate:>7.1%} {s.errors:>7} "
+              f"{s.input_tokens:>10} {s.output_tokens:>10} {p50}")
+    if throughput["attempts"] and elapsed > 0:
+        print(f"this run: {throughput['attempts']} attempts in {elapsed:.1f} s, "
+              f"{throughput['attempts'] / elapsed:.2f} attempts/s, {throughput['tokens'] / elapsed:.0f} tokens/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", help="attack prompts (.txt, one per line, or .jsonl)")
+    parser.add_argument("--levels", default="LEVELS", choices=sorted(DEFAULT_BACKENDS))
+    parser.add_argument("--level", type=int, action="append", default=[], help="only these levels (repeatable)")
+    parser.add_argument("--backend", help="LLM backend; defaults to LLM_BACKEND or the level set's backend")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", default="redteam_results.jsonl", help="results and resume checkpoint")
+    parser.add_argument("--restart", action="store_true", help="ignore and overwrite an existing output file")
+    parser.add_argument("--full-responses", action="store_true",
+                        help="read whole responses instead of stopping at the success condition")
+    args = parser.parse_args()
+
+    if args.backend:
+        os.environ["LLM_BACKEND"] = args.backend
+    game.configure(getattr(level_sets, args.levels), DEFAULT_BACKENDS[args.levels])
+    levels = game.current_levels()
+    selected = args.level or sorted(levels)
+    unknown = [level for level in selected if level not in levels]
+    if unknown:
+        parser.error(f"unknown level(s) {unknown}; {args.levels} has 1..{len(levels)}")
+
+    if args.restart and os.path.exists(args.output):
+        os.unlink(args.output)
+    done = read_checkpoint(args.output)
+    stats = defaultdict(LevelStats)
+    skipped = 0
+
+    def tasks():
+        nonlocal skipped
+        for prompt_id, prompt, only in read_corpus(args.corpus):
+            for level in selected:
+                if only is not None and level not in only:
+                    continue
+                row = done.get(attempt_key(prompt_id, level, levels))
+                if row is not None:
+                    add_row(stats, row)
+                    skipped += 1
+                    continue
+                yield prompt_id, prompt, level
+
+    throughput = {"attempts": 0, "tokens": 0}
+    start = time.perf_counter()
+    last_progress = start
+
+    # Called on the main thread as results are written
+    def on_row(row):
+        nonlocal last_progress
+        throughput["attempts"] += 1
+        throughput["tokens"] += row["input_tokens"] + row["output_tokens"]
+        add_row(stats, row)
+        now = time.perf_counter()
+        if now - last_progress >= PROGRESS_INTERVAL:
+            last_progress = now
+            print(f"... {throughput['attempts']} attempts, {throughput['attempts'] / (now - start):.2f}/s",
+                  file=sys.stderr)
+
+    try:
+        run(tasks(), args.output, args.concurrency, not args.full_responses, on_row)
+    except KeyboardInterrupt:
+        print("interrupted; rerun the same command to resume", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    if skipped:
+        print(f"resumed: {skipped} attempts already in {args.output}", file=sys.stderr)
+    if not stats:
+        print("no attempts: the corpus is empty or selects no levels", file=sys.stderr)
+        return
+    report(stats, elapsed, throughput)
+
+
+if __name__ == "__main__":
+    main()
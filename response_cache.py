@@ -0,0 +1,113 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+CACHE_ENABLED = os.getenv("RESPONSE_CACHE", "1") == "1"
+CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_prompt(text):
+    """Case-fold and collapse whitespace so trivially different copies share an entry"""
+    return _whitespace.sub(" ", text.casefold()).strip()
+
+
+def prompt_hash(system_prompt):
+    return hashlib.sha256(system_prompt.encode()).hexdigest()[:16]
+
+
+class ResponseCache:
+    """LRU response cache with TTL expiry, a byte budget and optional JSON persistence
+
+    Keys combine a hash of the level's system prompt with the normalized
+    user input, so editing a prompt invalidates its entries automatically.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL, path=CACHE_PATH):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.load()
+            atexit.register(self.save)
+
+    def key(self, system_prompt, user_input):
+        return f"{prompt_hash(system_prompt)}:{normalize_prompt(user_input)}"
+
+    def get(self, system_prompt, user_input):
+        """Return the cached response or None"""
+        key = self.key(system_prompt, user_input)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.time():
+                self._evict(key)
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, system_prompt, user_input, response):
+        key = self.key(system_prompt, user_input)
+        size = len(key) + len(response)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (response, time.time() + self.ttl, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key):
+        self.bytes -= self._entries.pop(key)[2]
+
+    def load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, "r") as f:
+            entries = json.load(f)
+        now = time.time()
+        with self._lock:
+            for key, response, expires in entries:
+                if expires > now:
+                    size = len(key) + len(response)
+                    self._entries[key] = (response, expires, size)
+                    self.bytes += size
+
+    def save(self):
+        """Write live entries to disk, replacing the previous file atomically"""
+        with self._lock:
+            entries = [[key, response, expires] for key, (response, expires, _) in self._entries.items()]
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide response cache, or None when caching is disabled"""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,204 @@
+import asyncio
+import concurrent.futures
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from metrics import QUEUE_WAIT_SECONDS
+
+RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "10"))
+BURST = int(os.getenv("LLM_BURST", "20"))
+MAX_QUEUE_DEPTH = int(os.getenv("LLM_MAX_QUEUE_DEPTH", "500"))
+MAX_QUEUED_PER_PLAYER = int(os.getenv("LLM_MAX_QUEUED_PER_PLAYER", "1"))
+MAX_IN_FLIGHT_PER_LEVEL = int(os.getenv("LLM_MAX_IN_FLIGHT_PER_LEVEL", "16"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_ERROR_CODES = {"ThrottlingException", "ServiceUnavailableException", "ModelNotReadyException"}
+
+
+class QueueFull(Exception):
+    """Raised when a request is refused because the dispatch queue is full"""
+
+
+def is_retryable(error):
+    """True for rate limits, overloads and transient network failures"""
+    if getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES:
+        return True
+    response = getattr(error, "response", None)
+    if isinstance(response, dict) and response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES:
+        return True
+    return type(error).__name__ in {"APIConnectionError", "APITimeoutError", "ConnectionError", "TimeoutError"}
+
+
+class TokenBucket:
+    """Global rate limiter refilled continuously at ``rate`` tokens per second"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _Ticket:
+    """An admitted request; releasing it frees its level's in-flight slot"""
+
+    def __init__(self, scheduler, level, wait):
+        self.scheduler = scheduler
+        self.level = level
+        self.wait = wait
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.scheduler._release(self.level)
+
+
+class RequestScheduler:
+    """Admission control for model calls, run on a background asyncio loop
+
+    Script threads enqueue a request per player and block until the loop
+    dispatches it. The loop serves players round-robin so nobody can starve
+    the others, takes a token from the global bucket for every dispatch and
+    skips levels that already have ``max_in_flight_per_level`` calls running.
+    Queues are bounded: a full queue raises QueueFull immediately so the UI
+    can ask the player to retry.
+    """
+
+    def __init__(self, rate=RATE_PER_SECOND, burst=BURST, max_queue_depth=MAX_QUEUE_DEPTH,
+                 max_queued_per_player=MAX_QUEUED_PER_PLAYER,
+                 max_in_flight_per_level=MAX_IN_FLIGHT_PER_LEVEL, max_retries=MAX_RETRIES):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_queue_depth = max_queue_depth
+        self.max_queued_per_player = max_queued_per_player
+        self.max_in_flight_per_level = max_in_flight_per_level
+        self.max_retries = max_retries
+        self.wait_times = deque(maxlen=2048)
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()
+        self._depth = 0
+        self._in_flight = defaultdict(int)
+        self._loop = asyncio.new_event_loop()
+        self._wakeup = None
+        ready = threading.Event()
+        threading.Thread(target=self._run_loop, args=(ready,), name="llm-scheduler", daemon=True).start()
+        ready.wait()
+
+    def _run_loop(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._wakeup = asyncio.Event()
+        self._loop.create_task(self._dispatch())
+        ready.set()
+        self._loop.run_forever()
+
+    def _notify(self):
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _next_request(self):
+        """Pop the oldest request of the first player, in rotation, whose level has capacity"""
+        with self._lock:
+            for player_id, queue in self._queues.items():
+                level, future, enqueued = queue[0]
+                if self._in_flight[level] >= self.max_in_flight_per_level:
+                    continue
+                queue.popleft()
+                del self._queues[player_id]
+                if queue:
+                    self._queues[player_id] = queue
+                self._depth -= 1
+                self._in_flight[level] += 1
+                return future, enqueued
+        return None
+
+    async def _dispatch(self):
+        while True:
+            request = self._next_request()
+            if request is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self.bucket.acquire()
+            future, enqueued = request
+            wait = time.monotonic() - enqueued
+            self.wait_times.append(wait)
+            QUEUE_WAIT_SECONDS.observe(wait)
+            future.set_result(wait)
+
+    def _release(self, level):
+        with self._lock:
+            self._in_flight[level] -= 1
+        self._notify()
+
+    def admit(self, player_id, level):
+        """Block until the request is dispatched; returns a ticket to release when done"""
+        future = concurrent.futures.Future()
+        with self._lock:
+            queue = self._queues.get(player_id)
+            if self._depth >= self.max_queue_depth:
+                raise QueueFull("The game is very busy right now. Please try again in a few seconds.")
+            if queue is not None and len(queue) >= self.max_queued_per_player:
+                raise QueueFull("Your previous message is still being processed.")
+            if queue is None:
+                queue = self._queues[player_id] = deque()
+            queue.append((level, future, time.monotonic()))
+            self._depth += 1
+        self._notify()
+        return _Ticket(self, level, future.result())
+
+    def run(self, player_id, level, call):
+        """Run ``call`` once admitted, retrying transient failures with jittered backoff"""
+        for attempt in range(self.max_retries + 1):
+            with self.admit(player_id, level):
+                try:
+                    return call()
+                except Exception as e:
+                    if attempt == self.max_retries or not is_retryable(e):
+                        raise
+            # Full jitter keeps retries from a burst of players from lining up again
+            time.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
+
+    def stats(self):
+        """Queue depth and queue-wait percentiles over recent dispatches"""
+        waits = sorted(self.wait_times)
+        with self._lock:
+            depth = self._depth
+            in_flight = sum(self._in_flight.values())
+
+        def percentile(q):
+            return waits[min(len(waits) - 1, int(q * len(waits)))] if waits else 0.0
+
+        return {
+            "queue_depth": depth,
+            "in_flight": in_flight,
+            "wait_p50": percentile(0.50),
+            "wait_p95": percentile(0.95),
+            "wait_p99": percentile(0.99),
+        }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide request scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
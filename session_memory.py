@@ -0,0 +1,172 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import weakref
+
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024)))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "600"))
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "prompt_game_sessions")
+SWEEP_INTERVAL = 30.0
+TRUNCATION_MARK = " …[truncated]"
+
+
+class ChatMessage:
+    """One chat history entry; ``tokens`` is filled in lazily by prompt_builder"""
+
+    __slots__ = ("id", "role", "content", "tokens")
+
+    def __init__(self, id, role, content, tokens=None):
+        self.id = id
+        self.role = role
+        self.content = content
+        self.tokens = tokens
+
+
+def intern_text(text):
+    """Share one copy of identical strings, such as popular attack prompts, across sessions"""
+    return sys.intern(text) if type(text) is str else text
+
+
+def _size(message):
+    return len(message.content.encode())
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class ChatHistory:
+    """A session's chat history with a byte cap that can spill to disk when idle
+
+    Behaves like the list it replaces (append, clear, len, indexing,
+    iteration). Once the messages' content exceeds ``max_bytes`` the oldest
+    exchanges are dropped, and a single message larger than half the cap is
+    truncated. A sweeper thread writes histories untouched for
+    SESSION_IDLE_SECONDS to a file in SESSION_SPILL_DIR and frees them; the
+    next access reads them back. ``render_memo`` is chat_render's HTML memo,
+    kept here so a spill drops it too.
+    """
+
+    __slots__ = ("max_bytes", "render_memo", "_messages", "_bytes", "_touched", "_spilled", "_lock",
+                 "__weakref__")
+
+    def __init__(self, max_bytes=SESSION_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.render_memo = {}
+        self._messages = []
+        self._bytes = 0
+        self._touched = time.monotonic()
+        self._spilled = None
+        self._lock = threading.Lock()
+        _register(self)
+
+    def _load(self):
+        """Bring spilled messages back into memory; call with the lock held"""
+        self._touched = time.monotonic()
+        if self._spilled is None:
+            return
+        path = self._spilled.detach()[2][0]
+        self._spilled = None
+        with open(path, "r") as f:
+            self._messages = [
+                ChatMessage(id, intern_text(role), intern_text(content) if role == "user" else content)
+                for id, role, content in json.load(f)
+            ]
+        _unlink(path)
+
+    def append(self, message):
+        limit = self.max_bytes // 2
+        if _size(message) > limit:
+            message.content = message.content.encode()[:limit].decode(errors="ignore") + TRUNCATION_MARK
+            message.tokens = None
+        with self._lock:
+            self._load()
+            self._messages.append(message)
+            self._bytes += _size(message)
+            # Drop whole (user, assistant) exchanges so prompt_builder still sees pairs
+            while self._bytes > self.max_bytes and len(self._messages) > 2:
+                for dropped in self._messages[:2]:
+                    self._bytes -= _size(dropped)
+                del self._messages[:2]
+
+    def clear(self):
+        with self._lock:
+            if self._spilled is not None:
+                _unlink(self._spilled.detach()[2][0])
+                self._spilled = None
+            self._touched = time.monotonic()
+            self._messages = []
+            self._bytes = 0
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._messages)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        with self._lock:
+            self._load()
+            return self._messages[index]
+
+    def __iter__(self):
+        with self._lock:
+            self._load()
+            return iter(list(self._messages))
+
+    def spill(self, directory=SESSION_SPILL_DIR):
+        """Move the messages to a file until they are next needed; True if anything was written"""
+        with self._lock:
+            if self._spilled is not None or not self._messages:
+                return False
+            os.makedirs(directory, exist_ok=True)
+            fd, path = tempfile.mkstemp(prefix="history-", suffix=".json", dir=directory)
+            with os.fdopen(fd, "w") as f:
+                json.dump([[m.id, m.role, m.content] for m in self._messages], f)
+            # The file goes away with the session if it never comes back
+            self._spilled = weakref.finalize(self, _unlink, path)
+            self._messages = []
+            self.render_memo.clear()
+            return True
+
+    def idle_for(self):
+        return time.monotonic() - self._touched
+
+
+_histories = weakref.WeakSet()
+_histories_lock = threading.Lock()
+_sweeper = None
+
+
+def _register(history):
+    global _sweeper
+    with _histories_lock:
+        _histories.add(history)
+        if _sweeper is None and SESSION_IDLE_SECONDS > 0:
+            _sweeper = threading.Thread(target=_sweep, name="session-spill", daemon=True)
+            _sweeper.start()
+
+
+def _sweep():
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        spill_idle(SESSION_IDLE_SECONDS)
+
+
+def spill_idle(idle_seconds=SESSION_IDLE_SECONDS):
+    """Spill every history untouched for ``idle_seconds``; returns how many were spilled"""
+    with _histories_lock:
+        histories = list(_histories)
+    return sum(1 for history in histories if history.idle_for() >= idle_seconds and history.spill())
@@ -0,0 +1,65 @@
+import concurrent.futures
+import hashlib
+import threading
+
+
+def submission_key(*parts):
+    """Stable idempotency key for a submission"""
+    return hashlib.sha256("\x00".join(str(part) for part in parts).encode()).hexdigest()
+
+
+class SingleFlight:
+    """Coalesce identical calls that are in flight at the same time
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    with the same key while it runs wait on the leader's future instead of
+    starting their own. If the leader was interrupted rather than failing
+    (Streamlit stops a script run with a BaseException when the player
+    reruns it), a waiting caller takes over as the new leader.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, call):
+        """Return (result, shared); ``shared`` is True when another caller's result was reused"""
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self._calls[key] = concurrent.futures.Future()
+            if leader:
+                return self._lead(key, future, call), False
+            error = future.exception()
+            if error is None:
+                return future.result(), True
+            if isinstance(error, Exception):
+                raise error
+
+    def _lead(self, key, future, call):
+        try:
+            result = call()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+_group = None
+_group_lock = threading.Lock()
+
+
+def get_single_flight():
+    """Return the process-wide single-flight group for model calls"""
+    global _group
+    with _group_lock:
+        if _group is None:
+            _group = SingleFlight()
+        return _group
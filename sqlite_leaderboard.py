@@ -0,0 +1,275 @@
+import sqlite3
+import threading
+import time
+
+REFRESH_INTERVAL = 1.0
+CHANGE_LOG_KEEP = 100_000
+ENTRY_FIELDS = ("player", "level", "attempts", "timestamp")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS leaderboard_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player TEXT NOT NULL,
+        level INTEGER NOT NULL,
+        attempts INTEGER NOT NULL,
+        timestamp TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS leaderboard_entries_rank ON leaderboard_entries (level DESC, attempts ASC);
+    CREATE INDEX IF NOT EXISTS leaderboard_entries_player ON leaderboard_entries (player);
+    CREATE TABLE IF NOT EXISTS leaderboard_best (
+        player TEXT PRIMARY KEY,
+        level INTEGER NOT NULL,
+        attempts INTEGER NOT NULL,
+        timestamp TEXT NOT NULL,
+        entry_id INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS leaderboard_best_rank ON leaderboard_best (level DESC, attempts ASC, entry_id ASC);
+    CREATE TABLE IF NOT EXISTS leaderboard_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        old_level INTEGER,
+        old_attempts INTEGER,
+        new_level INTEGER NOT NULL,
+        new_attempts INTEGER NOT NULL
+    );
+"""
+
+
+def _better(level, attempts, best):
+    return best is None or (-level, attempts) < (-best[0], best[1])
+
+
+class _Fenwick:
+    """Binary indexed tree of counts by attempts; grows by doubling"""
+
+    def __init__(self, size=64):
+        self.tree = [0] * (size + 1)
+
+    def add(self, index, delta):
+        if index + 1 >= len(self.tree):
+            self._grow(index + 1)
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index):
+        """Sum of the counts below ``index``"""
+        i = min(index, len(self.tree) - 1)
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def _grow(self, minimum):
+        size = len(self.tree) - 1
+        counts = [self.prefix(i + 1) - self.prefix(i) for i in range(size)]
+        while size < minimum:
+            size *= 2
+        self.tree = [0] * (size + 1)
+        for index, count in enumerate(counts):
+            if count:
+                self.add(index, count)
+
+
+class RankIndex:
+    """Count of players' best results by (level, attempts)
+
+    One Fenwick tree per level answers "how many players did better" in
+    O(levels + log max_attempts), which is O(log n) for a fixed game.
+    """
+
+    def __init__(self):
+        self._levels = {}
+        self._totals = {}
+
+    def add(self, level, attempts, delta=1):
+        tree = self._levels.get(level)
+        if tree is None:
+            tree = self._levels[level] = _Fenwick()
+        tree.add(attempts, delta)
+        self._totals[level] = self._totals.get(level, 0) + delta
+
+    def better_than(self, level, attempts):
+        above = sum(count for other, count in self._totals.items() if other > level)
+        tree = self._levels.get(level)
+        return above + (tree.prefix(attempts) if tree is not None else 0)
+
+    def __len__(self):
+        return sum(self._totals.values())
+
+
+class SQLiteLeaderboard:
+    """Leaderboard history and per-player bests in SQLite (WAL mode)
+
+    Every result is kept in ``leaderboard_entries``; ``leaderboard_best``
+    holds each player's best one, upserted in the same transaction, so
+    rankings list each player once. Both tables are indexed in rank order,
+    so top-k and page reads are index walks. Ranks come from an in-memory
+    RankIndex. Every change to a best row is also appended to
+    ``leaderboard_changes`` in the same transaction; each process applies
+    the rows past the last one it has seen as deltas, so writes to other
+    tables in the file (such as progress) cost nothing, and only a process
+    that fell behind the last CHANGE_LOG_KEEP changes rescans
+    ``leaderboard_best``. Entry dicts use the same keys as leaderboard_store
+    and gain a ``rank`` on reads.
+    """
+
+    def __init__(self, path, refresh_interval=REFRESH_INTERVAL):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._seq = 0
+        self._next_check = 0.0
+        self._ranks = None
+        self._views = {}
+
+    def _catch_up(self, force=False):
+        """Apply leaderboard changes other connections have committed since the last check"""
+        now = time.monotonic()
+        if not force and self._ranks is not None and now < self._next_check:
+            return
+        self._next_check = now + self.refresh_interval
+        if self._ranks is None:
+            self._rebuild()
+            return
+        changes = self._db.execute(
+            "SELECT seq, old_level, old_attempts, new_level, new_attempts FROM leaderboard_changes "
+            "WHERE seq > ? ORDER BY seq", (self._seq,)
+        ).fetchall()
+        if not changes:
+            return
+        if changes[0][0] != self._seq + 1:
+            # The rows we needed were pruned; start over from the best table
+            self._rebuild()
+            return
+        for seq, old_level, old_attempts, new_level, new_attempts in changes:
+            self._apply(old_level, old_attempts, new_level, new_attempts)
+        self._seq = changes[-1][0]
+        self.version += 1
+
+    def _rebuild(self):
+        ranks = RankIndex()
+        # Read in one transaction, so the sequence number matches the rows counted
+        own_transaction = not self._db.in_transaction
+        if own_transaction:
+            self._db.execute("BEGIN")
+        try:
+            self._seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM leaderboard_changes").fetchone()[0]
+            for level, attempts in self._db.execute("SELECT level, attempts FROM leaderboard_best"):
+                ranks.add(level, attempts)
+        finally:
+            if own_transaction:
+                self._db.execute("COMMIT")
+        self._ranks = ranks
+        self.version += 1
+
+    def _apply(self, old_level, old_attempts, new_level, new_attempts):
+        if old_level is not None:
+            self._ranks.add(old_level, old_attempts, delta=-1)
+        self._ranks.add(new_level, new_attempts)
+
+    def add(self, entry):
+        self.add_many([entry])
+
+    def add_many(self, entries):
+        """Record results in one transaction, keeping each player's best"""
+        if not entries:
+            return
+        with self._lock:
+            if self._ranks is None:
+                self._rebuild()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Holding the write lock, so nobody can commit between this catch-up and our changes
+                self._catch_up(force=True)
+                seq = self._seq
+                for entry in entries:
+                    row = tuple(entry[field] for field in ENTRY_FIELDS)
+                    entry_id = self._db.execute(
+                        "INSERT INTO leaderboard_entries (player, level, attempts, timestamp) VALUES (?, ?, ?, ?)", row
+                    ).lastrowid
+                    best = self._db.execute(
+                        "SELECT level, attempts FROM leaderboard_best WHERE player = ?", (entry["player"],)
+                    ).fetchone()
+                    if not _better(entry["level"], entry["attempts"], best):
+                        continue
+                    self._db.execute(
+                        "INSERT INTO leaderboard_best (player, level, attempts, timestamp, entry_id) "
+                        "VALUES (?, ?, ?, ?, ?) ON CONFLICT(player) DO UPDATE SET level = excluded.level, "
+                        "attempts = excluded.attempts, timestamp = excluded.timestamp, entry_id = excluded.entry_id",
+                        row + (entry_id,)
+                    )
+                    change = (*(best or (None, None)), entry["level"], entry["attempts"])
+                    seq = self._db.execute(
+                        "INSERT INTO leaderboard_changes (old_level, old_attempts, new_level, new_attempts) "
+                        "VALUES (?, ?, ?, ?)", change
+                    ).lastrowid
+                    self._apply(*change)
+                if seq > CHANGE_LOG_KEEP:
+                    self._db.execute("DELETE FROM leaderboard_changes WHERE seq <= ?", (seq - CHANGE_LOG_KEEP,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                # The index may hold part of the rolled back batch
+                self._ranks = None
+                raise
+            self._seq = seq
+            self.version += 1
+
+    def _rows(self, rows):
+        entries = [dict(zip(ENTRY_FIELDS, row)) for row in rows]
+        for entry in entries:
+            entry["rank"] = 1 + self._ranks.better_than(entry["level"], entry["attempts"])
+        return entries
+
+    def page(self, page, size=10):
+        """Return one page (0-based) of players' best results in rank order"""
+        with self._lock:
+            self._catch_up()
+            return self._rows(self._db.execute(
+                "SELECT player, level, attempts, timestamp FROM leaderboard_best "
+                "ORDER BY level DESC, attempts ASC, entry_id ASC LIMIT ? OFFSET ?", (size, page * size)
+            ))
+
+    def top(self, k=10):
+        return self.page(0, k)
+
+    def rank(self, player):
+        """1-based rank of a player's best result (ties share a rank), or None"""
+        with self._lock:
+            self._catch_up()
+            best = self._db.execute(
+                "SELECT level, attempts FROM leaderboard_best WHERE player = ?", (player,)
+            ).fetchone()
+            return None if best is None else 1 + self._ranks.better_than(*best)
+
+    def history(self, player):
+        """Every result a player has recorded, oldest first"""
+        with self._lock:
+            return [dict(zip(ENTRY_FIELDS, row)) for row in self._db.execute(
+                "SELECT player, level, attempts, timestamp FROM leaderboard_entries WHERE player = ? ORDER BY id",
+                (player,)
+            )]
+
+    def __len__(self):
+        """Number of ranked players"""
+        with self._lock:
+            self._catch_up()
+            return len(self._ranks)
+
+    def cached_view(self, name, k, builder):
+        """Return builder(top k entries), rebuilt only when the leaderboard changes"""
+        with self._lock:
+            self._catch_up()
+            cached = self._views.get((name, k))
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            view = builder(self.top(k))
+            self._views[(name, k)] = (self.version, view)
+            return view
@@ -0,0 +1,367 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from leaderboard_store import get_store, rank_key
+from sqlite_leaderboard import SQLiteLeaderboard
+from write_behind import WriteBehindBackend
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "file")
+SQLITE_PATH = os.getenv("STATE_SQLITE_PATH", "game_state.db")
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_PREFIX = os.getenv("REDIS_PREFIX", "prompt_game:")
+PROGRESS_TTL = int(os.getenv("PROGRESS_TTL", str(7 * 24 * 3600)))
+PROGRESS_MAX_SESSIONS = int(os.getenv("PROGRESS_MAX_SESSIONS", "10000"))
+WRITE_BEHIND = os.getenv("LEADERBOARD_WRITE_BEHIND", "1") == "1"
+WRITE_BEHIND_INTERVAL = float(os.getenv("LEADERBOARD_FLUSH_INTERVAL", "0.5"))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("LEADERBOARD_FLUSH_BATCH", "100"))
+REFRESH_INTERVAL = 1.0
+
+
+class StateBackend:
+    """Leaderboard and player progress shared by every worker process
+
+    Subclasses implement ``_add``, ``top``, ``remote_version`` and the
+    progress methods. ``cached_view`` memoizes a derived view (such as the
+    leaderboard DataFrame) until this process writes or another worker's
+    write is noticed; the remote check runs at most once per second.
+    """
+
+    def __init__(self):
+        self._local_writes = 0
+        self._remote_version = None
+        self._next_check = 0.0
+        self._views = {}
+        self._views_lock = threading.Lock()
+
+    # True when top() lists each player once, at their best result
+    unique_players = False
+
+    def add_entry(self, entry):
+        self._add(entry)
+        self._local_writes += 1
+
+    def add_entries(self, entries):
+        for entry in entries:
+            self._add(entry)
+        self._local_writes += 1
+
+    def version(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._remote_version = self.remote_version()
+            self._next_check = now + REFRESH_INTERVAL
+        return (self._local_writes, self._remote_version)
+
+    def cached_view(self, name, k, builder):
+        """Return builder(top k entries), rebuilt only when the leaderboard changes"""
+        version = self.version()
+        with self._views_lock:
+            cached = self._views.get((name, k))
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        view = builder(self.top(k))
+        with self._views_lock:
+            self._views[(name, k)] = (version, view)
+        return view
+
+    def _add(self, entry):
+        raise NotImplementedError
+
+    def top(self, k=10):
+        raise NotImplementedError
+
+    def rank(self, player):
+        """1-based rank of a player's best result, or None where unsupported"""
+        return None
+
+    def remote_version(self):
+        raise NotImplementedError
+
+    def load_progress(self, session_id):
+        raise NotImplementedError
+
+    def save_progress(self, session_id, progress):
+        raise NotImplementedError
+
+
+class FileStateBackend(StateBackend):
+    """Single-node default: the append-only leaderboard file, progress kept in memory
+
+    Progress expires after PROGRESS_TTL like the other backends, and at most
+    PROGRESS_MAX_SESSIONS sessions are kept, least recently saved dropped first.
+    """
+
+    def __init__(self, max_sessions=PROGRESS_MAX_SESSIONS):
+        super().__init__()
+        self.store = get_store()
+        self.max_sessions = max_sessions
+        # session_id -> (saved at, progress), least recently saved first
+        self._progress = OrderedDict()
+        self._progress_lock = threading.Lock()
+
+    def add_entry(self, entry):
+        self.store.add(entry)
+
+    def add_entries(self, entries):
+        self.store.add_many(entries)
+
+    def top(self, k=10):
+        return self.store.top(k)
+
+    def cached_view(self, name, k, builder):
+        return self.store.cached_view(name, k, builder)
+
+    def load_progress(self, session_id):
+        with self._progress_lock:
+            saved = self._progress.get(session_id)
+        if saved is None or saved[0] <= time.time() - PROGRESS_TTL:
+            return None
+        return saved[1]
+
+    def save_progress(self, session_id, progress):
+        now = time.time()
+        with self._progress_lock:
+            self._progress.pop(session_id, None)
+            self._progress[session_id] = (now, progress)
+            while self._progress:
+                oldest, (saved_at, _) = next(iter(self._progress.items()))
+                if saved_at > now - PROGRESS_TTL and len(self._progress) <= self.max_sessions:
+                    break
+                del self._progress[oldest]
+
+
+class SQLiteStateBackend(StateBackend):
+    """SQLite in WAL mode: readers never block the writer, safe across processes on one node
+
+    The leaderboard is a SQLiteLeaderboard (one ranked row per player) in the
+    same database file as the progress table.
+    """
+
+    def __init__(self, path=SQLITE_PATH):
+        super().__init__()
+        self.path = path
+        self.leaderboard = SQLiteLeaderboard(path)
+        self._local = threading.local()
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS progress (
+                session_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    unique_players = True
+
+    def add_entry(self, entry):
+        self.leaderboard.add(entry)
+
+    def add_entries(self, entries):
+        self.leaderboard.add_many(entries)
+
+    def top(self, k=10):
+        return self.leaderboard.top(k)
+
+    def rank(self, player):
+        return self.leaderboard.rank(player)
+
+    def cached_view(self, name, k, builder):
+        return self.leaderboard.cached_view(name, k, builder)
+
+    def load_progress(self, session_id):
+        row = self._connect().execute(
+            "SELECT data FROM progress WHERE session_id = ? AND updated > ?",
+            (session_id, time.time() - PROGRESS_TTL)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_progress(self, session_id, progress):
+        self._connect().execute(
+            "INSERT INTO progress (session_id, data, updated) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, updated = excluded.updated",
+            (session_id, json.dumps(progress), time.time())
+        )
+
+
+class LocalRedis:
+    """In-process stand-in for the subset of the redis-py client used here"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._expiry = {}
+        self._zsets = defaultdict(dict)
+
+    def _expired(self, key):
+        expires = self._expiry.get(key)
+        if expires is not None and expires <= time.time():
+            self._values.pop(key, None)
+            del self._expiry[key]
+            return True
+        return False
+
+    def get(self, key):
+        with self._lock:
+            if self._expired(key):
+                return None
+            value = self._values.get(key)
+            return value.encode() if isinstance(value, str) else value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._values[key] = value
+            if ex is not None:
+                self._expiry[key] = time.time() + ex
+            else:
+                self._expiry.pop(key, None)
+        return True
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = int(self._values.get(key, 0)) + amount
+            self._values[key] = str(value)
+            return value
+
+    def zadd(self, key, mapping):
+        with self._lock:
+            added = sum(1 for member in mapping if member not in self._zsets[key])
+            self._zsets[key].update(mapping)
+            return added
+
+    def zrange(self, key, start, end):
+        with self._lock:
+            ordered = sorted(self._zsets[key].items(), key=lambda item: (item[1], item[0]))
+        end = len(ordered) if end == -1 else end + 1
+        return [member.encode() if isinstance(member, str) else member for member, _ in ordered[start:end]]
+
+    def zcard(self, key):
+        with self._lock:
+            return len(self._zsets[key])
+
+    def pipeline(self, transaction=True):
+        return _LocalPipeline(self)
+
+
+class _LocalPipeline:
+    """Queues LocalRedis calls and runs them on ``execute``, like a redis-py pipeline"""
+
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+class RedisStateBackend(StateBackend):
+    """Redis (or anything speaking its interface): shared across nodes
+
+    The leaderboard is a sorted set scored so that ascending order is the
+    game's ranking, (-level, attempts). Redis orders members with equal
+    scores lexicographically, so each member starts with a zero-padded
+    sequence number to keep ties in insertion order. A batch of entries
+    reserves its sequence numbers with one INCRBY and is written with one
+    pipelined ZADD, two round trips whatever its size. Progress is one key
+    per session with a TTL.
+    """
+
+    def __init__(self, client, prefix=REDIS_PREFIX):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, name):
+        return f"{self.prefix}{name}"
+
+    def _add(self, entry):
+        self._add_many([entry])
+
+    def add_entries(self, entries):
+        if entries:
+            self._add_many(entries)
+        self._local_writes += 1
+
+    def _add_many(self, entries):
+        last = self.client.incr(self._key("leaderboard:seq"), len(entries))
+        members = {}
+        for seq, entry in enumerate(entries, last - len(entries) + 1):
+            level, attempts = rank_key(entry)
+            members[f"{seq:020d}:{json.dumps(entry, sort_keys=True)}"] = level * 1e9 + attempts
+        pipe = self.client.pipeline()
+        pipe.zadd(self._key("leaderboard"), members)
+        pipe.incr(self._key("leaderboard:version"))
+        pipe.execute()
+
+    def top(self, k=10):
+        members = self.client.zrange(self._key("leaderboard"), 0, k - 1)
+        return [json.loads(member.decode().partition(":")[2]) for member in members]
+
+    def remote_version(self):
+        return self.client.get(self._key("leaderboard:version"))
+
+    def load_progress(self, session_id):
+        data = self.client.get(self._key(f"progress:{session_id}"))
+        return json.loads(data) if data else None
+
+    def save_progress(self, session_id, progress):
+        self.client.set(self._key(f"progress:{session_id}"), json.dumps(progress), ex=PROGRESS_TTL)
+
+
+def _redis_from_env():
+    # The in-process stand-in shares nothing between workers, so it has to be asked for
+    if REDIS_URL == "local":
+        return RedisStateBackend(LocalRedis())
+    if not REDIS_URL:
+        raise ValueError("STATE_BACKEND=redis needs REDIS_URL (or REDIS_URL=local for an in-process stand-in)")
+    import redis
+
+    return RedisStateBackend(redis.Redis.from_url(REDIS_URL))
+
+
+STATE_BACKENDS = {
+    "file": FileStateBackend,
+    "sqlite": SQLiteStateBackend,
+    "redis": _redis_from_env,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_state_backend():
+    """Return the process-wide state backend selected by STATE_BACKEND
+
+    Leaderboard writes go through a write-behind queue unless
+    LEADERBOARD_WRITE_BEHIND=0.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if STATE_BACKEND not in STATE_BACKENDS:
+                raise ValueError(f"Unknown state backend {STATE_BACKEND!r}; expected one of {sorted(STATE_BACKENDS)}")
+            _backend = STATE_BACKENDS[STATE_BACKEND]()
+            if WRITE_BEHIND:
+                _backend = WriteBehindBackend(_backend, WRITE_BEHIND_INTERVAL, WRITE_BEHIND_MAX_BATCH)
+        return _backend
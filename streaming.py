@@ -0,0 +1,34 @@
+import time
+
+RENDER_INTERVAL = 0.05
+
+
+def consume_stream(chunks, on_text, matcher=None, render_interval=RENDER_INTERVAL):
+    """Drain an iterator of text deltas, rendering as it goes
+
+    ``on_text`` is called with the text so far at most once per
+    ``render_interval`` seconds and once more at the end. Each delta is fed
+    to ``matcher`` (a StreamMatcher); on a match the stream is closed, which
+    cancels the rest of the upstream generation. Returns
+    ``(text, stopped_early)``.
+    """
+    parts = []
+    stopped = False
+    last_render = 0.0
+    try:
+        for delta in chunks:
+            parts.append(delta)
+            if matcher is not None and matcher.feed(delta):
+                stopped = True
+                break
+            now = time.monotonic()
+            if now - last_render >= render_interval:
+                on_text("".join(parts))
+                last_render = now
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    text = "".join(parts)
+    on_text(text)
+    return text, stopped
@@ -0,0 +1,27 @@
+class StreamMatcher:
+    """Case-insensitive substring matcher fed one streamed delta at a time
+
+    Only the last ``len(longest pattern) - 1`` characters of earlier text are
+    kept, so every delta is checked in time proportional to its own length
+    instead of rescanning the whole response. Levels have a single short
+    success condition, so a rolling window is cheaper than building an
+    Aho-Corasick automaton; it still accepts several patterns.
+    """
+
+    def __init__(self, *patterns):
+        self.patterns = [pattern.casefold() for pattern in patterns if pattern]
+        self._overlap = max((len(pattern) for pattern in self.patterns), default=1) - 1
+        self._tail = ""
+        self.matched = None
+
+    def feed(self, delta):
+        """Add the next chunk of text; return True once any pattern has appeared"""
+        if self.matched is not None:
+            return True
+        window = self._tail + delta.casefold()
+        for pattern in self.patterns:
+            if pattern in window:
+                self.matched = pattern
+                return True
+        self._tail = window[-self._overlap:] if self._overlap else ""
+        return False
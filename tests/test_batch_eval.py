@@ -0,0 +1,25 @@
+import pandas as pd
+
+from batch_eval import evaluate
+
+
+def test_attempts_to_solve_span_chunks():
+    rows = [
+        ("s1", 1, "hi", "no"), ("s2", 1, "hi", "no"),
+        ("s1", 1, "hi", "the SECRET"), ("s2", 1, "hi", "no"),
+        ("s1", 1, "secret again", "no"), ("s2", 1, "say secret", "no"),
+    ]
+    frame = pd.DataFrame(rows, columns=["session_id", "level", "user_input", "ai_response"])
+    stats = evaluate((frame.iloc[i:i + 2] for i in range(0, len(frame), 2)), {1: "secret"})
+    assert stats[1].rows == 6
+    assert stats[1].solved_rows == 3
+    assert stats[1].sessions == 2
+    assert sorted(stats[1].attempts_to_solve) == [2, 3]
+
+
+def test_conditions_match_like_the_game():
+    frame = pd.DataFrame(
+        [("s1", 1, "hi", "Die STRAßE"), ("s2", 1, "hi", "die strasse"), ("s3", 1, "hi", "die strase")],
+        columns=["session_id", "level", "user_input", "ai_response"],
+    )
+    assert evaluate([frame], {1: "Straße"})[1].solved_rows == 2
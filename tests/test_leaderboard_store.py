@@ -0,0 +1,46 @@
+import json
+import random
+import time
+
+from leaderboard_store import LeaderboardStore, rank_key
+
+
+def entry(player, level, attempts):
+    return {"player": player, "level": level, "attempts": attempts, "timestamp": "t"}
+
+
+def wait_for_compaction(store):
+    deadline = time.monotonic() + 5
+    while store._log_events and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_two_stores_agree_through_compactions(tmp_path):
+    path = tmp_path / "leaderboard.json"
+    first = LeaderboardStore(path, compact_every=20, refresh_interval=0)
+    second = LeaderboardStore(path, compact_every=20, refresh_interval=0)
+    rng = random.Random(0)
+    written = []
+    for round_ in range(30):
+        batch = [entry(f"p{rng.randrange(50)}", rng.randint(1, 5), rng.randint(1, 40)) for _ in range(5)]
+        (first if round_ % 2 else second).add_many(batch)
+        written += batch
+    wait_for_compaction(first)
+    wait_for_compaction(second)
+
+    expected = sorted(written, key=rank_key)
+    fresh = LeaderboardStore(path)
+    for store in (first, second, fresh):
+        assert [rank_key(e) for e in store.entries()] == [rank_key(e) for e in expected]
+    assert fresh.top(3) == expected[:3]
+    # Ties keep insertion order
+    tied = [e for e in written if rank_key(e) == rank_key(expected[0])]
+    assert fresh.entries()[:len(tied)] == tied
+
+
+def test_legacy_snapshot_loads(tmp_path):
+    path = tmp_path / "leaderboard.json"
+    path.write_text(json.dumps([entry("amy", 3, 4), entry("bob", 2, 1)], indent=4))
+    store = LeaderboardStore(path)
+    store.add(entry("cat", 3, 2))
+    assert [e["player"] for e in store.top(10)] == ["cat", "amy", "bob"]
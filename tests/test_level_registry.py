@@ -0,0 +1,39 @@
+import json
+import os
+
+from level_registry import LevelRegistry
+
+
+def level(name, condition="SECRET"):
+    return {"name": name, "objective": "o", "system_prompt": f"You guard {name}", "success_condition": condition,
+            "hint": "h", "max_attempts": 5}
+
+
+def write(path, levels):
+    tmp = path.with_name(".levels.tmp")
+    tmp.write_text(json.dumps({str(number): data for number, data in levels.items()}))
+    os.replace(tmp, path)
+
+
+def test_snapshot_survives_reload(tmp_path):
+    path = tmp_path / "levels.json"
+    write(path, {1: level("one"), 2: level("two", "Open Sesame")})
+    registry = LevelRegistry(path, check_interval=0)
+    snapshot = registry.current()
+    assert snapshot[2]["success_folded"] == "open sesame"
+    assert snapshot[2]["number"] == 2
+
+    write(path, {1: level("uno")})
+    assert len(registry) == 1 and registry[1]["name"] == "uno"
+    assert registry.version == 1
+    assert snapshot[2]["name"] == "two"
+
+
+def test_broken_file_keeps_previous_levels(tmp_path):
+    path = tmp_path / "levels.json"
+    write(path, {1: level("one")})
+    registry = LevelRegistry(path, check_interval=0)
+    path.write_text("{broken")
+    assert registry[1]["name"] == "one"
+    write(path, {1: level("one"), 3: level("three")})
+    assert len(registry) == 1
@@ -0,0 +1,81 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import llm_backends
+from llm_backends import Backend, CircuitBreaker, HedgedBackend
+
+LEVEL = {"number": 1, "name": "one", "system_prompt": "You guard one"}
+
+
+class Scripted(Backend):
+    def __init__(self, text, ttft=0.0, error=None):
+        self.text = text
+        self.ttft = ttft
+        self.error = error
+        self.calls = 0
+
+    def stream(self, level, messages):
+        self.calls += 1
+        time.sleep(self.ttft)
+        if self.error is not None:
+            raise self.error
+        yield from self.text.split(" ")
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    def install(**named):
+        for name, backend in named.items():
+            monkeypatch.setitem(llm_backends._backends, name, backend)
+        return named
+
+    return install
+
+
+def test_slow_primary_is_hedged(backends):
+    stubs = backends(slow=Scripted("too late", ttft=2.0), fast=Scripted("from the secondary"))
+    hedged = HedgedBackend("slow", "fast", hedge_delay=0.05)
+    start = time.monotonic()
+    assert " ".join(hedged.stream(LEVEL, [])) == "from the secondary"
+    assert time.monotonic() - start < 1.0
+    assert stubs["fast"].calls == 1
+    assert hedged.breakers["slow"].state == "closed" and hedged.breakers["slow"].failures == 0
+
+
+def test_failing_primary_fails_over_at_once(backends):
+    backends(down=Scripted("", error=ConnectionError("refused")), up=Scripted("still here"))
+    hedged = HedgedBackend("down", "up", hedge_delay=10.0)
+    start = time.monotonic()
+    assert " ".join(hedged.stream(LEVEL, [])) == "still here"
+    assert time.monotonic() - start < 1.0
+    assert hedged.breakers["down"].failures == 1
+
+
+def test_errors_from_both_backends_raise_the_primary_error(backends):
+    backends(a=Scripted("", error=ConnectionError("a")), b=Scripted("", error=TimeoutError("b")))
+    hedged = HedgedBackend("a", "b", hedge_delay=10.0)
+    with pytest.raises(ConnectionError):
+        list(hedged.stream(LEVEL, []))
+
+
+def test_breaker_opens_probes_and_closes(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_backends, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    breaker = CircuitBreaker("x", failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # One probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow() and breaker.allow()
@@ -0,0 +1,39 @@
+import sys
+import threading
+import types
+
+import llm_clients
+
+
+def fake_module(monkeypatch, name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    monkeypatch.setitem(sys.modules, name, module)
+    return module
+
+
+def test_bedrock_llm_builds_without_deadlock(monkeypatch):
+    monkeypatch.setattr(llm_clients, "_clients", {})
+    clients = []
+
+    def client(**kwargs):
+        clients.append(kwargs)
+        return object()
+
+    fake_module(monkeypatch, "boto3", client=client)
+    fake_module(monkeypatch, "botocore")
+    fake_module(monkeypatch, "botocore.config", Config=lambda **kwargs: kwargs)
+    fake_module(monkeypatch, "llama_index")
+    fake_module(monkeypatch, "llama_index.llms")
+    fake_module(monkeypatch, "llama_index.llms.bedrock", Bedrock=lambda **kwargs: kwargs)
+
+    result = []
+    worker = threading.Thread(target=lambda: result.append(llm_clients.get_bedrock_llm("m", "r")), daemon=True)
+    worker.start()
+    worker.join(5)
+    assert result, "get_bedrock_llm did not return"
+
+    llm = result[0]
+    assert llm["model"] == "m" and llm["client"] is llm_clients.get_bedrock_client("r")
+    assert llm_clients.get_bedrock_llm("m", "r") is llm
+    assert len(clients) == 1 and clients[0]["region_name"] == "r"
@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import QueueFull, RequestScheduler
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def queue_up(scheduler, player, order):
+    """Admit ``player`` on a thread, recording the dispatch order; waits until it is queued"""
+    depth = scheduler._depth
+
+    def run():
+        with scheduler.admit(player, 1):
+            order.append(player)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    wait_for(lambda: scheduler._depth == depth + 1)
+    return thread
+
+
+def test_players_are_served_round_robin():
+    scheduler = RequestScheduler(rate=1000, burst=1000, max_queued_per_player=3, max_in_flight_per_level=1)
+    order = []
+    # The holder keeps the level's only slot busy until everyone is queued
+    with scheduler.admit("holder", 1):
+        threads = [queue_up(scheduler, player, order) for player in ("amy", "amy", "amy", "bob")]
+    for thread in threads:
+        thread.join(5)
+    assert order == ["amy", "bob", "amy", "amy"]
+
+
+def test_full_queues_refuse_at_once():
+    scheduler = RequestScheduler(rate=1000, burst=1000, max_queue_depth=2, max_in_flight_per_level=1)
+    order = []
+    with scheduler.admit("holder", 1):
+        threads = [queue_up(scheduler, "amy", order)]
+        with pytest.raises(QueueFull, match="still being processed"):
+            scheduler.admit("amy", 1)
+        threads.append(queue_up(scheduler, "bob", order))
+        with pytest.raises(QueueFull, match="very busy"):
+            scheduler.admit("cat", 1)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["amy", "bob"] and scheduler.stats()["queue_depth"] == 0
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+class Interrupted(BaseException):
+    """Stands in for Streamlit stopping a script run"""
+
+
+def start(target):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(target()), daemon=True)
+    thread.start()
+    return thread, results
+
+
+def follower(group, key, calls):
+    """Join ``key`` once the leader is running; the pause lets it start waiting"""
+    thread, results = start(lambda: group.do(key, lambda: calls.append("follower") or "own"))
+    time.sleep(0.1)
+    return thread, results
+
+
+def test_concurrent_identical_calls_are_coalesced():
+    group = SingleFlight()
+    entered, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append("leader")
+        entered.set()
+        release.wait(5)
+        return "answer"
+
+    leader, led = start(lambda: group.do("k", slow))
+    entered.wait(5)
+    waiter, waited = follower(group, "k", calls)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+    assert calls == ["leader"]
+    assert led == [("answer", False)] and waited == [("answer", True)]
+    assert group.do("k", lambda: "again") == ("again", False)
+
+
+def test_failures_are_shared():
+    group = SingleFlight()
+    entered, release = threading.Event(), threading.Event()
+    calls = []
+
+    def failing():
+        entered.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    leader, _ = start(lambda: pytest.raises(ValueError, group.do, "k", failing))
+    entered.wait(5)
+    waiter, waited = start(lambda: pytest.raises(ValueError, group.do, "k", lambda: calls.append("follower")))
+    time.sleep(0.1)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+    assert calls == [] and len(waited) == 1
+
+
+def test_waiter_takes_over_from_an_interrupted_leader():
+    group = SingleFlight()
+    entered, release = threading.Event(), threading.Event()
+    calls = []
+
+    def interrupted():
+        entered.set()
+        release.wait(5)
+        raise Interrupted()
+
+    leader, _ = start(lambda: pytest.raises(Interrupted, group.do, "k", interrupted))
+    entered.wait(5)
+    waiter, waited = follower(group, "k", calls)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+    assert calls == ["follower"] and waited == [("own", False)]
@@ -0,0 +1,69 @@
+import random
+import sqlite3
+
+import sqlite_leaderboard
+from sqlite_leaderboard import SQLiteLeaderboard
+
+
+def entry(player, level, attempts):
+    return {"player": player, "level": level, "attempts": attempts, "timestamp": "2024-01-01 00:00:00"}
+
+
+def brute_force_ranks(entries):
+    best = {}
+    for e in entries:
+        key = (-e["level"], e["attempts"])
+        if e["player"] not in best or key < best[e["player"]]:
+            best[e["player"]] = key
+    return {player: 1 + sum(other < key for other in best.values()) for player, key in best.items()}
+
+
+def check_ranks(board, entries):
+    expected = brute_force_ranks(entries)
+    assert len(board) == len(expected)
+    for player, rank in expected.items():
+        assert board.rank(player) == rank
+    for row in board.top(20):
+        assert row["rank"] == expected[row["player"]]
+
+
+def test_ranks_match_brute_force_across_connections(tmp_path):
+    path = str(tmp_path / "state.db")
+    rng = random.Random(0)
+    writer, reader = SQLiteLeaderboard(path, refresh_interval=0), SQLiteLeaderboard(path, refresh_interval=0)
+    entries = []
+    for round_ in range(20):
+        batch = [entry(f"p{rng.randrange(150)}", rng.randint(1, 5), rng.randint(1, 30)) for _ in range(50)]
+        (writer if round_ % 2 else reader).add_many(batch)
+        entries += batch
+        check_ranks(writer, entries)
+        check_ranks(reader, entries)
+
+
+def test_other_tables_do_not_invalidate_views(tmp_path):
+    path = str(tmp_path / "state.db")
+    board = SQLiteLeaderboard(path, refresh_interval=0)
+    board.add_many([entry("amy", 2, 3), entry("bob", 1, 4)])
+    builds = []
+    board.cached_view("top", 10, builds.append)
+
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("CREATE TABLE IF NOT EXISTS progress (session_id TEXT PRIMARY KEY, data TEXT)")
+    other.execute("INSERT INTO progress VALUES ('s1', '{}')")
+    board.cached_view("top", 10, builds.append)
+    assert len(builds) == 1
+
+    SQLiteLeaderboard(path).add(entry("cat", 3, 1))
+    board.cached_view("top", 10, builds.append)
+    assert len(builds) == 2
+    assert [e["player"] for e in builds[-1]] == ["cat", "amy", "bob"]
+
+
+def test_pruned_change_log_rebuilds(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite_leaderboard, "CHANGE_LOG_KEEP", 5)
+    path = str(tmp_path / "state.db")
+    reader = SQLiteLeaderboard(path, refresh_interval=0)
+    assert len(reader) == 0
+    entries = [entry(f"p{i}", 1 + i % 3, i) for i in range(30)]
+    SQLiteLeaderboard(path).add_many(entries)
+    check_ranks(reader, entries)
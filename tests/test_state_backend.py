@@ -0,0 +1,84 @@
+import pytest
+
+import state_backend
+from state_backend import FileStateBackend, LocalRedis, RedisStateBackend
+
+
+def entry(player, level, attempts):
+    return {"player": player, "level": level, "attempts": attempts, "timestamp": "t"}
+
+
+def test_redis_ties_keep_insertion_order():
+    backend = RedisStateBackend(LocalRedis())
+    for player in ("zed", "amy", "bob"):
+        backend.add_entry(entry(player, 2, 5))
+    backend.add_entry(entry("cat", 3, 9))
+    assert [e["player"] for e in backend.top(3)] == ["cat", "zed", "amy"]
+    assert backend.top(1) == [entry("cat", 3, 9)]
+
+
+class CountingRedis(LocalRedis):
+    """Counts round trips: direct calls, and one per pipeline execute"""
+
+    def __init__(self):
+        super().__init__()
+        self.round_trips = 0
+        self._pipelined = False
+
+    def incr(self, key, amount=1):
+        self.round_trips += not self._pipelined
+        return super().incr(key, amount)
+
+    def zadd(self, key, mapping):
+        self.round_trips += not self._pipelined
+        return super().zadd(key, mapping)
+
+    def pipeline(self, transaction=True):
+        pipe = super().pipeline(transaction)
+        execute = pipe.execute
+
+        def counted():
+            self.round_trips += 1
+            self._pipelined = True
+            try:
+                return execute()
+            finally:
+                self._pipelined = False
+
+        pipe.execute = counted
+        return pipe
+
+
+def test_redis_batch_is_two_round_trips():
+    client = CountingRedis()
+    backend = RedisStateBackend(client)
+    backend.add_entry(entry("zed", 2, 5))
+    client.round_trips = 0
+    backend.add_entries([entry("amy", 2, 5), entry("bob", 3, 1), entry("cat", 2, 5)])
+    assert client.round_trips == 2
+    assert [e["player"] for e in backend.top(4)] == ["bob", "zed", "amy", "cat"]
+
+
+def test_file_progress_is_bounded_and_expires(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    now = [1000.0]
+    monkeypatch.setattr(state_backend.time, "time", lambda: now[0])
+    monkeypatch.setattr(state_backend, "PROGRESS_TTL", 60)
+    backend = FileStateBackend(max_sessions=3)
+    for session in "abcd":
+        backend.save_progress(session, {"session": session})
+    assert backend.load_progress("a") is None
+    assert backend.load_progress("d") == {"session": "d"}
+
+    now[0] += 61
+    assert backend.load_progress("d") is None
+    backend.save_progress("e", {})
+    assert list(backend._progress) == ["e"]
+
+
+def test_redis_needs_a_url_or_an_explicit_stand_in(monkeypatch):
+    monkeypatch.setattr(state_backend, "REDIS_URL", None)
+    with pytest.raises(ValueError, match="REDIS_URL"):
+        state_backend._redis_from_env()
+    monkeypatch.setattr(state_backend, "REDIS_URL", "local")
+    assert isinstance(state_backend._redis_from_env().client, LocalRedis)
@@ -0,0 +1,42 @@
+import os
+import time
+
+import pytest
+
+from transcripts import TranscriptRecorder, read_transcripts, transcript_files
+
+
+def test_parts_expire_after_retention(tmp_path):
+    old = tmp_path / "transcripts-20200101-000000-1-0001.jsonl.gz"
+    old.write_bytes(b"")
+    week_ago = time.time() - 7 * 86400
+    os.utime(old, (week_ago, week_ago))
+
+    recorder = TranscriptRecorder(tmp_path, fmt="jsonl", flush_interval=60, retention_days=1)
+    recorder.record("s1", "amy", 1, "hi", "hello", False)
+    recorder.close()
+
+    files = transcript_files(tmp_path)
+    assert old not in files and len(files) == 1
+    frame = next(read_transcripts(tmp_path))
+    assert frame["player"].tolist() == ["amy"]
+
+
+def test_failed_write_keeps_rows_and_buffer_stays_bounded(tmp_path, monkeypatch):
+    recorder = TranscriptRecorder(tmp_path, fmt="jsonl", flush_interval=60, max_buffered=2)
+
+    def broken_open():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(recorder, "_open_part", broken_open)
+    for player in ("amy", "bob", "cat"):
+        recorder.record("s1", player, 1, "hi", "hello", False)
+    with pytest.raises(OSError):
+        recorder.flush()
+    assert recorder.dropped == 1 and len(recorder._buffer) == 2
+
+    monkeypatch.undo()
+    recorder.close()
+    frame = next(read_transcripts(tmp_path))
+    assert frame["player"].tolist() == ["amy", "bob"]
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith(".tmp")]
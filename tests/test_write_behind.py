@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from write_behind import WriteBehindBackend
+
+
+class SlowBackend:
+    unique_players = False
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.entries = []
+        self.writing = threading.Event()
+
+    def add_entries(self, entries):
+        self.writing.set()
+        time.sleep(self.delay)
+        self.entries += entries
+
+    def top(self, k=10):
+        return sorted(self.entries, key=lambda e: (-e["level"], e["attempts"]))[:k]
+
+    def cached_view(self, name, k, builder):
+        return builder(self.top(k))
+
+
+def entry(player, level):
+    return {"player": player, "level": level, "attempts": 1, "timestamp": "t"}
+
+
+def test_reads_do_not_wait_for_a_flush():
+    backend = SlowBackend(delay=0.5)
+    queue = WriteBehindBackend(backend, flush_interval=60)
+    queue.add_entry(entry("amy", 2))
+    flusher = threading.Thread(target=queue.flush)
+    flusher.start()
+    backend.writing.wait()
+
+    start = time.perf_counter()
+    queue.add_entry(entry("bob", 1))
+    players = [e["player"] for e in queue.top(10)]
+    view = queue.cached_view("top", 10, lambda entries: [e["player"] for e in entries])
+    assert time.perf_counter() - start < 0.1
+    assert players == view == ["amy", "bob"]
+
+    flusher.join()
+    queue.flush()
+    assert [e["player"] for e in queue.top(10)] == ["amy", "bob"]
+
+
+def test_failed_flush_keeps_entries():
+    backend = SlowBackend(delay=0)
+    write = backend.add_entries
+    backend.add_entries = lambda entries: 1 / 0
+    queue = WriteBehindBackend(backend, flush_interval=60)
+    queue.add_entry(entry("amy", 2))
+    with pytest.raises(ZeroDivisionError):
+        queue.flush()
+    assert [e["player"] for e in queue.top(10)] == ["amy"]
+
+    backend.add_entries = write
+    queue.flush()
+    assert [e["player"] for e in backend.entries] == ["amy"]
@@ -0,0 +1,249 @@
+import atexit
+import gzip
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Fall back to gzipped JSON lines
+    pa = pq = None
+
+# Off unless asked for: transcripts hold player names and everything they typed
+TRANSCRIPTS_ENABLED = os.getenv("TRANSCRIPTS", "0") == "1"
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "transcripts")
+TRANSCRIPT_FORMAT = os.getenv("TRANSCRIPT_FORMAT", "parquet" if pq is not None else "jsonl")
+FLUSH_INTERVAL = 1.0
+ROWS_PER_FILE = int(os.getenv("TRANSCRIPT_ROWS_PER_FILE", "100000"))
+SECONDS_PER_FILE = float(os.getenv("TRANSCRIPT_SECONDS_PER_FILE", "300"))
+RETENTION_DAYS = float(os.getenv("TRANSCRIPT_RETENTION_DAYS", "30"))
+MAX_BUFFERED_ROWS = int(os.getenv("TRANSCRIPT_MAX_BUFFERED_ROWS", "50000"))
+
+COLUMNS = ("ts", "session_id", "player", "level", "user_input", "ai_response", "solved")
+EXTENSIONS = {"parquet": ".parquet", "jsonl": ".jsonl.gz"}
+
+logger = logging.getLogger(__name__)
+
+
+class _ParquetPart:
+    def __init__(self, path):
+        self.schema = pa.schema([
+            ("ts", pa.float64()), ("session_id", pa.string()), ("player", pa.string()),
+            ("level", pa.int32()), ("user_input", pa.string()), ("ai_response", pa.string()),
+            ("solved", pa.bool_()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows):
+        # Each flush becomes one row group, so readers can stream the file group by group
+        columns = {name: [row[name] for row in rows] for name in COLUMNS}
+        self.writer.write_table(pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class _JsonlPart:
+    def __init__(self, path):
+        self.file = open(path, "wb")
+
+    def write(self, rows):
+        # One gzip member per flush; concatenated members are still a valid gzip file
+        data = "".join(json.dumps(row) + "\n" for row in rows).encode()
+        self.file.write(gzip.compress(data))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class TranscriptRecorder:
+    """Append-only transcript sink that keeps file I/O off the request thread
+
+    ``record`` appends a turn to an in-memory buffer; a background thread
+    writes the buffer out every ``flush_interval`` seconds into the current
+    part file, Parquet (zstd) when pyarrow is installed, gzipped JSON lines
+    otherwise. Parts are written under a hidden ``.tmp`` name and renamed
+    into place once they reach ``rows_per_file`` rows or
+    ``seconds_per_file`` seconds, so readers only ever see complete files.
+    File names carry the pid, so several workers can share a directory.
+    Each rotation deletes parts older than ``retention_days`` (0 keeps them).
+    A failed write abandons the unpublished part and keeps its rows for the
+    next round; while writes keep failing at most ``max_buffered`` rows are
+    held and newer turns are dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, directory=TRANSCRIPT_DIR, fmt=TRANSCRIPT_FORMAT, flush_interval=FLUSH_INTERVAL,
+                 rows_per_file=ROWS_PER_FILE, seconds_per_file=SECONDS_PER_FILE, retention_days=RETENTION_DAYS,
+                 max_buffered=MAX_BUFFERED_ROWS):
+        if fmt not in EXTENSIONS:
+            raise ValueError(f"Unknown transcript format {fmt!r}; expected one of {sorted(EXTENSIONS)}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.rows_per_file = rows_per_file
+        self.seconds_per_file = seconds_per_file
+        self.retention_days = retention_days
+        self.max_buffered = max_buffered
+        self.dropped = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._part = None
+        self._part_path = None
+        self._part_rows = 0
+        self._part_opened = 0.0
+        self._seq = 0
+        self._stop = threading.Event()
+        threading.Thread(target=self._run, name="transcript-writer", daemon=True).start()
+        atexit.register(self.close)
+
+    def record(self, session_id, player, level, user_input, ai_response, solved):
+        row = {
+            "ts": time.time(), "session_id": session_id, "player": player, "level": level,
+            "user_input": user_input, "ai_response": ai_response, "solved": solved,
+        }
+        with self._lock:
+            if len(self._buffer) >= self.max_buffered:
+                self.dropped += 1
+                return
+            self._buffer.append(row)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Transcript flush failed; will retry (%d turns dropped so far)", self.dropped)
+
+    def _open_part(self):
+        self._seq += 1
+        name = f"transcripts-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._seq:04d}{EXTENSIONS[self.fmt]}"
+        self._part_path = self.directory / name
+        tmp_path = self._part_path.with_name(f".{name}.tmp")
+        self._part = _ParquetPart(tmp_path) if self.fmt == "parquet" else _JsonlPart(tmp_path)
+        self._part_rows = 0
+        self._part_opened = time.monotonic()
+
+    def _rotate(self):
+        if self._part is None:
+            return
+        self._part.close()
+        os.replace(self._part_path.with_name(f".{self._part_path.name}.tmp"), self._part_path)
+        self._part = None
+        self._expire()
+
+    def _abandon_part(self):
+        """Drop an unpublished part after a failed write; readers never saw it"""
+        if self._part is None:
+            return
+        tmp_path = self._part_path.with_name(f".{self._part_path.name}.tmp")
+        self._part = None
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+    def _expire(self):
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for path in transcript_files(self.directory):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                pass  # Another worker expired it first
+
+    def flush(self):
+        """Write buffered turns to the current part, rotating it when it is full or old"""
+        with self._write_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if rows:
+                try:
+                    if self._part is None:
+                        self._open_part()
+                    self._part.write(rows)
+                except BaseException:
+                    self._abandon_part()
+                    with self._lock:
+                        self._buffer[:0] = rows
+                        del self._buffer[self.max_buffered:]
+                    raise
+                self._part_rows += len(rows)
+            if self._part is not None and (
+                self._part_rows >= self.rows_per_file
+                or time.monotonic() - self._part_opened >= self.seconds_per_file
+            ):
+                self._rotate()
+
+    def close(self):
+        """Flush everything and publish the current part"""
+        self._stop.set()
+        self.flush()
+        with self._write_lock:
+            self._rotate()
+
+
+def transcript_files(directory=TRANSCRIPT_DIR):
+    """Completed part files, oldest first"""
+    directory = Path(directory)
+    return sorted(
+        path for path in directory.iterdir()
+        if not path.name.startswith(".") and path.name.endswith(tuple(EXTENSIONS.values()))
+    )
+
+
+def _read_jsonl(path, batch_size, columns):
+    import pandas as pd
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        rows = []
+        for line in gzip.GzipFile(fileobj=mapped):
+            rows.append(json.loads(line))
+            if len(rows) >= batch_size:
+                yield pd.DataFrame(rows, columns=columns)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows, columns=columns)
+
+
+def read_transcripts(source=TRANSCRIPT_DIR, batch_size=65536, columns=None):
+    """Stream transcripts as pandas DataFrames of at most ``batch_size`` rows
+
+    ``source`` is a transcript directory or a single part file. Files are
+    memory-mapped and read a row group (Parquet) or a batch of lines
+    (JSON lines) at a time, so memory stays bounded whatever the total size.
+    """
+    source = Path(source)
+    paths = transcript_files(source) if source.is_dir() else [source]
+    columns = list(columns or COLUMNS)
+    for path in paths:
+        if path.name.endswith(".parquet"):
+            parquet = pq.ParquetFile(path, memory_map=True)
+            for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+                yield batch.to_pandas()
+        else:
+            yield from _read_jsonl(path, batch_size, columns)
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_transcript_recorder():
+    """Return the process-wide recorder, or None unless TRANSCRIPTS=1"""
+    global _recorder
+    if not TRANSCRIPTS_ENABLED:
+        return None
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = TranscriptRecorder()
+        return _recorder
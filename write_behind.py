@@ -0,0 +1,117 @@
+import atexit
+import logging
+import threading
+
+from leaderboard_store import rank_key
+
+FLUSH_INTERVAL = 0.5
+MAX_BATCH = 100
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBackend:
+    """Queue leaderboard writes in memory and flush them from a background thread
+
+    ``add_entry`` only appends to a list, so a player finishing a level never
+    waits on disk or the network. The flusher writes everything pending in
+    one ``add_entries`` call every ``flush_interval`` seconds, or sooner once
+    ``max_batch`` entries are waiting; a failed flush keeps the entries and
+    retries on the next round. Pending entries, and the batch being written,
+    are merged into ``top`` and ``cached_view`` so players see their result
+    straight away; neither waits for a write in progress. An atexit
+    hook flushes whatever is left on shutdown. Everything else, including
+    progress, goes straight to the wrapped backend.
+    """
+
+    def __init__(self, backend, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending = []
+        # The batch being written; still merged into reads until it lands
+        self._in_flight = []
+        self._landed = 0
+        self._generation = 0
+        self._views = {}
+        self._lock = threading.Lock()
+        # Only serializes flushes; readers never wait on a write
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        threading.Thread(target=self._run, name="leaderboard-writer", daemon=True).start()
+        atexit.register(self.flush)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def add_entry(self, entry):
+        with self._lock:
+            self._pending.append(entry)
+            self._generation += 1
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Leaderboard flush failed; will retry")
+
+    def flush(self):
+        """Write all pending entries to the backend in one batch"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch = self._in_flight = self._pending
+                self._pending = []
+            try:
+                self.backend.add_entries(batch)
+            except BaseException:
+                with self._lock:
+                    self._pending[:0] = batch
+                    self._in_flight = []
+                raise
+            with self._lock:
+                self._in_flight = []
+                self._landed += 1
+                self._generation += 1
+
+    def _merge(self, entries, unwritten, k):
+        merged = sorted(entries + unwritten, key=rank_key)
+        if self.backend.unique_players:
+            seen = set()
+            merged = [e for e in merged if not (e["player"] in seen or seen.add(e["player"]))]
+        return merged[:k]
+
+    def _unwritten(self):
+        """Entries not yet in the backend, and how many batches had landed; call with the lock held"""
+        return self._in_flight + self._pending, self._landed
+
+    def top(self, k=10):
+        while True:
+            with self._lock:
+                unwritten, landed = self._unwritten()
+            entries = self.backend.top(k)
+            with self._lock:
+                # A batch that landed meanwhile may be in both lists; read again
+                if self._landed == landed:
+                    return self._merge(entries, unwritten, k)
+
+    def cached_view(self, name, k, builder):
+        with self._lock:
+            has_unwritten = bool(self._pending or self._in_flight)
+            generation = self._generation
+            cached = self._views.get((name, k))
+        if not has_unwritten:
+            return self.backend.cached_view(name, k, builder)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        view = builder(self.top(k))
+        with self._lock:
+            self._views[(name, k)] = (generation, view)
+        return view